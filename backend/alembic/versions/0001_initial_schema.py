@@ -0,0 +1,114 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'farmers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('phone', sa.String(length=15), nullable=False),
+        sa.Column('location', sa.String(length=200), nullable=False),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_farmers_id', 'farmers', ['id'])
+    op.create_index('ix_farmers_email', 'farmers', ['email'], unique=True)
+
+    op.create_table(
+        'farms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('farmer_id', sa.Integer(), sa.ForeignKey('farmers.id'), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('size_acres', sa.Float(), nullable=False),
+        sa.Column('soil_type', sa.String(length=50), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_farms_id', 'farms', ['id'])
+
+    op.create_table(
+        'crops',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+        sa.Column('crop_name', sa.String(length=100), nullable=False),
+        sa.Column('planting_date', sa.DateTime(), nullable=False),
+        sa.Column('expected_harvest_date', sa.DateTime(), nullable=True),
+        sa.Column('current_stage', sa.String(length=50), nullable=False),
+        sa.Column('area_planted', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_crops_id', 'crops', ['id'])
+
+    op.create_table(
+        'recommendations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+        sa.Column('crop_id', sa.Integer(), sa.ForeignKey('crops.id'), nullable=False),
+        sa.Column('recommendation_type', sa.String(length=50), nullable=False),
+        sa.Column('title', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('priority', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_recommendations_id', 'recommendations', ['id'])
+
+    op.create_table(
+        'weather_data',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+        sa.Column('temperature', sa.Float(), nullable=False),
+        sa.Column('humidity', sa.Float(), nullable=False),
+        sa.Column('rainfall', sa.Float(), nullable=False),
+        sa.Column('wind_speed', sa.Float(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_weather_data_id', 'weather_data', ['id'])
+
+    op.create_table(
+        'disease_detections',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('farm_id', sa.Integer(), sa.ForeignKey('farms.id'), nullable=False),
+        sa.Column('crop_id', sa.Integer(), sa.ForeignKey('crops.id'), nullable=False),
+        sa.Column('image_path', sa.String(length=500), nullable=False),
+        sa.Column('predicted_disease', sa.String(length=100), nullable=False),
+        sa.Column('confidence_score', sa.Float(), nullable=False),
+        sa.Column('detection_date', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_disease_detections_id', 'disease_detections', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('disease_detections')
+    op.drop_table('weather_data')
+    op.drop_table('recommendations')
+    op.drop_table('crops')
+    op.drop_table('farms')
+    op.drop_table('farmers')
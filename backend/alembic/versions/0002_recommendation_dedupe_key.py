@@ -0,0 +1,30 @@
+"""add recommendation dedupe key
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('recommendations') as batch_op:
+        batch_op.add_column(sa.Column('dedupe_key', sa.String(length=100), nullable=True))
+        batch_op.create_unique_constraint('uq_recommendations_dedupe_key', ['dedupe_key'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('recommendations') as batch_op:
+        batch_op.drop_constraint('uq_recommendations_dedupe_key', type_='unique')
+        batch_op.drop_column('dedupe_key')
@@ -0,0 +1,29 @@
+"""add (farm, time) composite indexes for history queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_recommendations_farm_id_created_at', 'recommendations', ['farm_id', 'created_at'])
+    op.create_index('ix_weather_data_farm_id_recorded_at', 'weather_data', ['farm_id', 'recorded_at'])
+    op.create_index('ix_disease_detections_farm_id_detection_date', 'disease_detections', ['farm_id', 'detection_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_disease_detections_farm_id_detection_date', table_name='disease_detections')
+    op.drop_index('ix_weather_data_farm_id_recorded_at', table_name='weather_data')
+    op.drop_index('ix_recommendations_farm_id_created_at', table_name='recommendations')
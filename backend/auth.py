@@ -1,14 +1,22 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import asyncio
+import hmac
+import threading
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 import os
 from dotenv import load_dotenv
 
-from database import get_db
+from database import get_async_db
 from models import Farmer
 from schemas import TokenData
 
@@ -17,25 +25,139 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+# bcrypt cost factor; stored hashes with a different cost are rehashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Concurrent bcrypt operations; each one keeps a CPU core busy for the length of the hash
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+# Secret for operator-only endpoints such as model reloads; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# Dedicated pool so a login spike queues here instead of on the event loop or the default executor
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 security = HTTPBearer()
 
+class PrincipalCache:
+    """
+    Bounded LRU cache of resolved farmers keyed by token subject (email),
+    with a TTL. Entries hold a snapshot of the farmer's columns and every hit
+    returns a fresh detached Farmer, so requests never share an instance.
+    ORM updates and deletes of a farmer invalidate its entry in this
+    process; the TTL bounds staleness for changes made elsewhere.
+    """
+    
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, email: str) -> Optional[Farmer]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return Farmer(**entry[1])
+    
+    def put(self, farmer: Farmer):
+        if self.ttl <= 0:
+            return
+        snapshot = {attr.key: getattr(farmer, attr.key) for attr in inspect(Farmer).column_attrs}
+        with self._lock:
+            self._entries[farmer.email] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(farmer.email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, email: str):
+        with self._lock:
+            if self._entries.pop(email, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+principal_cache = PrincipalCache()
+
+@event.listens_for(Farmer, "after_update")
+@event.listens_for(Farmer, "after_delete")
+def invalidate_cached_principal(mapper, connection, target):
+    """Drop a changed farmer from the principal cache, under its old email as well"""
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    for email in emails:
+        principal_cache.invalidate(email)
+    # Invalidate again on commit, in case a request cached the old row in between
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_principals", set()).update(emails)
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_principals(session):
+    for email in session.info.pop("stale_principals", ()):
+        principal_cache.invalidate(email)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def get_farmer_by_email(db: Session, email: str):
-    return db.query(Farmer).filter(Farmer.email == email).first()
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the password worker pool. Also returns a new hash
+    when the stored one no longer matches the hashing policy, otherwise None.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, pwd_context.verify_and_update, plain_password, hashed_password)
 
-def authenticate_farmer(db: Session, email: str, password: str):
-    farmer = get_farmer_by_email(db, email)
+async def get_farmer_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(Farmer).filter(Farmer.email == email))
+    return result.scalars().first()
+
+async def authenticate_farmer(db: AsyncSession, email: str, password: str):
+    farmer = await get_farmer_by_email(db, email)
     if not farmer:
         return False
-    if not verify_password(password, farmer.hashed_password):
+    valid, new_hash = await verify_password_async(password, farmer.hashed_password)
+    if not valid:
         return False
+    if new_hash is not None:
+        # Transparently upgrade the stored hash to the current cost
+        farmer.hashed_password = new_hash
+        await db.commit()
     return farmer
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -48,7 +170,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_farmer(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_farmer(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -63,8 +185,24 @@ async def get_current_farmer(credentials: HTTPAuthorizationCredentials = Depends
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    
-    farmer = get_farmer_by_email(db, email=token_data.email)
+
+    farmer = principal_cache.get(token_data.email)
     if farmer is None:
-        raise credentials_exception
+        farmer = await get_farmer_by_email(db, email=token_data.email)
+        if farmer is None:
+            raise credentials_exception
+        principal_cache.put(farmer)
     return farmer
+
+async def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding operator endpoints with the admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Admin endpoints are disabled"
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP benchmark for Agricultural Advisory System
+
+Boots the API in a separate uvicorn process against a seeded SQLite
+database, with a deterministic stub weather provider and a tiny stand-in
+disease model, then drives a weighted mix of requests at a fixed
+concurrency over real HTTP. Reports p50/p95/p99 latency and requests per
+second per endpoint and stores the results as JSON:
+
+    python benchmark.py --workload mixed --concurrency 16 --duration 30 --output results.json
+    python benchmark.py --compare baseline.json --output results.json
+
+Runs are reproducible: seeded data, stub weather and the request mix all
+derive from --seed. With --weather-server the stub weather is served by
+weather_stub_server.py over HTTP instead, so the real WeatherService client
+(timeouts, error handling) is part of the measurement.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+from PIL import Image
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+# Stand-in disease classes; names match the treatment table in ml_models
+BENCHMARK_DISEASE_CLASSES = ["Healthy", "Bacterial Blight", "Fungal Infection", "Viral Disease", "Nutrient Deficiency"]
+
+# Workload name -> endpoint name -> weight
+WORKLOADS = {
+    "mixed": {
+        "farms": 15,
+        "farms_overview": 10,
+        "farm_recommendations": 20,
+        "farm_weather": 15,
+        "crop_irrigation": 10,
+        "farm_fertilizer": 10,
+        "disease_detection": 10,
+        "health": 10,
+    },
+    "read": {
+        "farms": 25,
+        "farms_overview": 15,
+        "farm_recommendations": 30,
+        "crop_irrigation": 15,
+        "farm_fertilizer": 15,
+    },
+    "disease": {
+        "disease_detection": 90,
+        "health": 10,
+    },
+}
+
+class StubWeatherModel:
+    """Deterministic weather derived from coordinates, with a simulated upstream latency"""
+
+    def __init__(self, latency_ms: float):
+        self.latency = latency_ms / 1000.0
+
+    @staticmethod
+    def reading(latitude: float, longitude: float) -> Dict:
+        phase = latitude * 7.0 + longitude * 3.0
+        return {
+            "temperature": round(28 + 9 * math.sin(phase), 1),
+            "humidity": round(55 + 25 * math.cos(phase), 1),
+            "rainfall": round(max(0.0, 3 * math.cos(phase * 3)), 1),
+            "wind_speed": round(8 + 8 * math.sin(phase / 2), 1),
+            "description": "stub weather",
+        }
+
+    async def current_async(self, client, latitude: float, longitude: float) -> Dict:
+        await asyncio.sleep(self.latency)
+        return self._current(latitude, longitude)
+
+    async def forecast_async(self, client, latitude: float, longitude: float, days: int) -> Dict:
+        await asyncio.sleep(self.latency)
+        return self._forecast(latitude, longitude, days)
+
+    def _current(self, latitude: float, longitude: float) -> Dict:
+        phase = latitude * 7.0 + longitude * 3.0
+        return {
+            **self.reading(latitude, longitude),
+            "pressure": 1010.0,
+            "wind_direction": int(phase * 57) % 360,
+            "timestamp": 1700000000,
+        }
+
+    def _forecast(self, latitude: float, longitude: float, days: int) -> Dict:
+        base_time = datetime(2024, 6, 1)
+        forecast = [
+            {"datetime": (base_time + timedelta(hours=i * 3)).strftime("%Y-%m-%d %H:%M:%S"),
+             **self.reading(latitude + i * 0.01, longitude)}
+            for i in range(days * 8)
+        ]
+        return {"forecast": forecast, "city": "Benchmark", "country": "IN"}
+
+class TinyDiseaseModel:
+    """Stand-in disease model: a fixed linear map of mean colour, with optional simulated compute time"""
+
+    def __init__(self, latency_ms: float, seed: int):
+        self.latency = latency_ms / 1000.0
+        self.weights = np.random.default_rng(seed).normal(size=(3, len(BENCHMARK_DISEASE_CLASSES))) * 4
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        time.sleep(self.latency)
+        logits = batch.mean(axis=(1, 2)) @ self.weights
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+def serve(port: int, seed: int, weather_latency_ms: float, model_latency_ms: float, weather_server: bool = False):
+    """Run the API with the stand-in disease model and, unless weather_server, the stub weather provider installed"""
+    import uvicorn
+    import main
+    from ml_models import ml_manager
+    from weather_service import weather_service
+
+    if not weather_server:
+        weather = StubWeatherModel(weather_latency_ms)
+        weather_service._fetch_current_weather_async = weather.current_async
+        weather_service._fetch_weather_forecast_async = weather.forecast_async
+
+    ml_manager.disease_model = TinyDiseaseModel(model_latency_ms, seed)
+    ml_manager.disease_class_names = {str(i): name for i, name in enumerate(BENCHMARK_DISEASE_CLASSES)}
+    ml_manager.model_versions["disease_model"] = {"version": f"benchmark-{seed}"}
+
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+def seed_database(farmers: int, farms_per_farmer: int, crops_per_farm: int, history_rows: int, seed: int):
+    """Create the schema and insert farmers, farms, crops and history rows"""
+    from passlib.context import CryptContext
+    from sqlalchemy import insert
+    from sqlalchemy.orm import Session
+
+    from database import Base, engine
+    from models import Crop, DiseaseDetection, Farm, Farmer, Recommendation, WeatherData
+
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+    hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=int(os.environ["BCRYPT_ROUNDS"])).hash(BENCHMARK_PASSWORD)
+    stages = ["seedling", "vegetative", "flowering", "fruiting", "harvesting"]
+    soils = ["sandy", "loamy", "clay"]
+    start = datetime(2022, 1, 1)
+
+    with Session(engine) as db:
+        db.execute(insert(Farmer), [
+            {"name": f"Farmer {i}", "email": f"farmer{i}@example.com", "phone": "0000000000",
+             "location": "Kanpur", "hashed_password": hashed_password, "is_active": True}
+            for i in range(farmers)
+        ])
+        db.execute(insert(Farm), [
+            {"farmer_id": i + 1, "name": f"Farm {i}-{j}", "size_acres": rng.uniform(1, 20), "soil_type": rng.choice(soils),
+             "latitude": 26.4 + rng.uniform(-0.5, 0.5), "longitude": 80.3 + rng.uniform(-0.5, 0.5)}
+            for i in range(farmers) for j in range(farms_per_farmer)
+        ])
+        farm_count = farmers * farms_per_farmer
+        db.execute(insert(Crop), [
+            {"farm_id": farm_id, "crop_name": rng.choice(["wheat", "rice", "maize", "mustard"]),
+             "planting_date": start, "current_stage": rng.choice(stages), "area_planted": rng.uniform(0.5, 5)}
+            for farm_id in range(1, farm_count + 1) for _ in range(crops_per_farm)
+        ])
+
+        for farm_id in range(1, farm_count + 1):
+            crop_ids = [(farm_id - 1) * crops_per_farm + k + 1 for k in range(crops_per_farm)]
+            timestamps = [start + timedelta(hours=6 * n) for n in range(history_rows)]
+            db.execute(insert(Recommendation), [
+                {"farm_id": farm_id, "crop_id": rng.choice(crop_ids), "recommendation_type": rng.choice(["irrigation", "fertilizer", "general"]),
+                 "title": "Benchmark recommendation", "description": "Seeded for benchmarking", "priority": rng.choice(["low", "medium", "high"]),
+                 "status": "pending", "created_at": timestamp}
+                for timestamp in timestamps
+            ])
+            db.execute(insert(WeatherData), [
+                {"farm_id": farm_id, "temperature": 25.0, "humidity": 60.0, "rainfall": 0.0, "wind_speed": 5.0, "recorded_at": timestamp}
+                for timestamp in timestamps
+            ])
+            db.execute(insert(DiseaseDetection), [
+                {"farm_id": farm_id, "crop_id": rng.choice(crop_ids), "image_path": "uploads/benchmark.jpg",
+                 "predicted_disease": rng.choice(BENCHMARK_DISEASE_CLASSES), "confidence_score": rng.random(), "detection_date": timestamp}
+                for timestamp in timestamps
+            ])
+        db.commit()
+
+def benchmark_images(count: int, seed: int) -> List[bytes]:
+    """Small distinct JPEGs; requests draw from this set, so repeats hit the prediction cache"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).resize((640, 480)).save(buffer, "JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 60.0, health_path: str = "/health"):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during start-up")
+        try:
+            if requests.get(f"{base_url}{health_path}", timeout=1).status_code == 200:
+                return
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Benchmark server did not start in time")
+
+class Workload:
+    """Builds randomised requests for one worker from the seeded farm layout"""
+
+    def __init__(self, weights: Dict[str, int], tokens: List[str], farms_per_farmer: int, crops_per_farm: int,
+                 images: List[bytes], rng: random.Random):
+        self.names = list(weights)
+        self.weights = list(weights.values())
+        self.tokens = tokens
+        self.farms_per_farmer = farms_per_farmer
+        self.crops_per_farm = crops_per_farm
+        self.images = images
+        self.rng = rng
+
+    def next_request(self) -> Tuple[str, str, str, Dict]:
+        """Return (endpoint name, method, path, requests kwargs)"""
+        name = self.rng.choices(self.names, self.weights)[0]
+        farmer = self.rng.randrange(len(self.tokens))
+        farm_id = farmer * self.farms_per_farmer + self.rng.randrange(self.farms_per_farmer) + 1
+        crop_id = (farm_id - 1) * self.crops_per_farm + self.rng.randrange(self.crops_per_farm) + 1
+        kwargs = {"headers": {"Authorization": f"Bearer {self.tokens[farmer]}"}}
+
+        if name == "farms":
+            return name, "GET", "/farms", kwargs
+        if name == "farms_overview":
+            return name, "GET", "/farms/overview", kwargs
+        if name == "farm_recommendations":
+            return name, "GET", f"/farms/{farm_id}/recommendations", kwargs
+        if name == "farm_weather":
+            return name, "GET", f"/farms/{farm_id}/weather", kwargs
+        if name == "crop_irrigation":
+            return name, "GET", f"/farms/{farm_id}/crops/{crop_id}/irrigation", kwargs
+        if name == "farm_fertilizer":
+            return name, "GET", f"/farms/{farm_id}/fertilizer", kwargs
+        if name == "disease_detection":
+            kwargs["files"] = {"image": ("leaf.jpg", self.rng.choice(self.images), "image/jpeg")}
+            return name, "POST", f"/farms/{farm_id}/crops/{crop_id}/disease-detection", kwargs
+        return name, "GET", "/health", {}
+
+def run_load(base_url: str, workload_weights: Dict[str, int], tokens: List[str], args, images: List[bytes]) -> Tuple[List, float]:
+    """Drive the server from args.concurrency threads; returns (samples, elapsed seconds)"""
+    samples: List[Tuple[str, float, int]] = []
+    samples_lock = threading.Lock()
+    remaining = [args.requests] if args.requests else None
+    deadline = time.monotonic() + args.warmup + args.duration
+    measure_from = time.monotonic() + args.warmup
+
+    def worker(index: int):
+        session = requests.Session()
+        workload = Workload(workload_weights, tokens, args.farms_per_farmer, args.crops_per_farm,
+                            images, random.Random(args.seed * 1000 + index))
+        local = []
+        while True:
+            if remaining is not None:
+                with samples_lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+            elif time.monotonic() >= deadline:
+                break
+
+            name, method, path, kwargs = workload.next_request()
+            started = time.perf_counter()
+            try:
+                status_code = session.request(method, base_url + path, timeout=60, **kwargs).status_code
+            except requests.exceptions.RequestException:
+                status_code = 0
+            finished = time.perf_counter()
+            if remaining is not None or time.monotonic() >= measure_from:
+                local.append((name, finished - started, status_code))
+        with samples_lock:
+            samples.extend(local)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started if args.requests else args.duration
+    return samples, elapsed
+
+def summarize(samples: List[Tuple[str, float, int]], elapsed: float) -> Dict:
+    """Latency percentiles and throughput per endpoint and overall"""
+    def stats(latencies: List[float], errors: int) -> Dict:
+        values = np.array(latencies) * 1000.0
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(float(values.mean()), 2),
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "p99_ms": round(float(np.percentile(values, 99)), 2),
+            "max_ms": round(float(values.max()), 2),
+        }
+
+    endpoints = {}
+    for name in sorted({sample[0] for sample in samples}):
+        rows = [sample for sample in samples if sample[0] == name]
+        endpoints[name] = stats([row[1] for row in rows], sum(1 for row in rows if not 200 <= row[2] < 300))
+    overall = stats([row[1] for row in samples], sum(1 for row in samples if not 200 <= row[2] < 300)) if samples else {}
+    return {"overall": overall, "endpoints": endpoints}
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_report(results: Dict, baseline: Optional[Dict] = None):
+    header = f"{'endpoint':<22}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"{'p50 Δ':>9}{'p95 Δ':>9}{'rps Δ':>9}"
+    print(header)
+    rows = list(results["endpoints"].items()) + [("overall", results["overall"])]
+    for name, row in rows:
+        line = f"{name:<22}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9.1f}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+        if baseline:
+            before = baseline["overall"] if name == "overall" else baseline["endpoints"].get(name)
+            if before:
+                line += "".join(
+                    f"{(row[key] - before[key]) / before[key] * 100 if before[key] else 0.0:>+8.1f}%"
+                    for key in ("p50_ms", "p95_ms", "rps")
+                )
+        print(line)
+
+def main():
+    """Seed a database, boot the API and benchmark it"""
+    parser = argparse.ArgumentParser(description="End-to-end HTTP load benchmark")
+    parser.add_argument("--workload", choices=list(WORKLOADS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds of load")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--requests", type=int, default=0, help="Send exactly this many requests instead of running for --duration")
+    parser.add_argument("--farmers", type=int, default=20)
+    parser.add_argument("--farms-per-farmer", type=int, default=3)
+    parser.add_argument("--crops-per-farm", type=int, default=3)
+    parser.add_argument("--history-rows", type=int, default=1000, help="Recommendations, weather and detection rows per farm")
+    parser.add_argument("--images", type=int, default=32, help="Distinct images used for disease detection")
+    parser.add_argument("--weather-latency-ms", type=float, default=50.0, help="Simulated upstream weather latency")
+    parser.add_argument("--weather-server", action="store_true",
+                        help="Serve stub weather from weather_stub_server.py over HTTP instead of patching the fetches")
+    parser.add_argument("--weather-error-rate", type=float, default=0.0,
+                        help="Fraction of weather requests the stand-in server fails (with --weather-server)")
+    parser.add_argument("--model-latency-ms", type=float, default=20.0, help="Simulated disease model compute per batch")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--keep-workdir", action="store_true")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.seed, args.weather_latency_ms, args.model_latency_ms, args.weather_server)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="advisory-benchmark-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'benchmark.db')}",
+        MODEL_DIR=os.path.join(workdir, "models"),
+        OPENWEATHER_API_KEY="benchmark",
+        RECOMMENDATION_SCHEDULER_ENABLED="false",
+        MODEL_RELOAD_INTERVAL_SECONDS="0",
+        DISEASE_INFERENCE_PROCESSES="0",
+        DISEASE_PREDICTION_CACHE_PATH="",
+        BCRYPT_ROUNDS=os.getenv("BCRYPT_ROUNDS", "4"),
+    )
+    env.pop("ASYNC_DATABASE_URL", None)
+    os.environ.update(env)
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    server = None
+    weather_server = None
+    try:
+        print(f"Seeding {args.farmers * args.farms_per_farmer} farms in {workdir}...")
+        seed_database(args.farmers, args.farms_per_farmer, args.crops_per_farm, args.history_rows, args.seed)
+
+        serve_args = []
+        if args.weather_server:
+            weather_port = free_port()
+            weather_server = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_stub_server.py"),
+                 "--port", str(weather_port), "--seed", str(args.seed),
+                 "--latency-ms", str(args.weather_latency_ms), "--error-rate", str(args.weather_error_rate)],
+                cwd=workdir, env=env
+            )
+            wait_for_server(f"http://127.0.0.1:{weather_port}", weather_server, health_path="/_stub/config")
+            env["OPENWEATHER_BASE_URL"] = f"http://127.0.0.1:{weather_port}/data/2.5"
+            serve_args.append("--weather-server")
+
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--seed", str(args.seed),
+             "--weather-latency-ms", str(args.weather_latency_ms), "--model-latency-ms", str(args.model_latency_ms),
+             *serve_args],
+            cwd=workdir, env=env
+        )
+        wait_for_server(base_url, server)
+
+        tokens = []
+        for i in range(args.farmers):
+            response = requests.post(f"{base_url}/auth/login", json={"email": f"farmer{i}@example.com", "password": BENCHMARK_PASSWORD})
+            response.raise_for_status()
+            tokens.append(response.json()["access_token"])
+
+        images = benchmark_images(args.images, args.seed)
+        print(f"Running '{args.workload}' workload at concurrency {args.concurrency}...")
+        samples, elapsed = run_load(base_url, WORKLOADS[args.workload], tokens, args, images)
+
+        results = {
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "elapsed_seconds": round(elapsed, 3),
+                "config": {key: value for key, value in vars(args).items() if key not in ("serve", "port", "output", "compare", "keep_workdir")},
+            },
+            **summarize(samples, elapsed),
+        }
+
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        print_report(results, baseline)
+
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.output}")
+    finally:
+        for process in (server, weather_server):
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
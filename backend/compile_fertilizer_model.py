@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Offline compilation of the fertilizer model for array-backed inference
+
+Flattens the pickled random forest in models/fertilizer_model.pkl into
+models/fertilizer_model.forest and checks that both predict the same on
+synthetic inputs spanning the split thresholds of every feature:
+
+    python compile_fertilizer_model.py
+    python compile_fertilizer_model.py --check-only --samples 20000
+
+Serve the result by setting FERTILIZER_MODEL_BACKEND=compiled together with
+FERTILIZER_USE_TRAINED_MODEL=true.
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from fertilizer_forest import FERTILIZER_MODEL_FILES, CompiledForest, compile_forest, load_forest, save_forest
+
+def load_sklearn_model(path: str):
+    """Unpickle the fertilizer model, unwrapping a {"model", "columns"} bundle"""
+    with open(path, "rb") as f:
+        model = pickle.load(f)
+    if isinstance(model, dict) and "model" in model:
+        return model["model"], model.get("columns")
+    return model, None
+
+def synthetic_inputs(forest: CompiledForest, n_samples: int, seed: int = 0) -> np.ndarray:
+    """Rows drawn uniformly around the range of thresholds the forest splits on, per feature"""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_samples, forest.n_features_in_), dtype=np.float32)
+    internal = forest.threshold != -np.inf
+    for feature in range(forest.n_features_in_):
+        thresholds = forest.threshold[internal & (forest.feature == feature)]
+        if thresholds.size:
+            low, high = float(thresholds.min()), float(thresholds.max())
+            margin = max(high - low, 1.0) * 0.1
+            X[:, feature] = rng.uniform(low - margin, high + margin, n_samples)
+    return X
+
+def sklearn_input(model, X: np.ndarray):
+    """sklearn warns when a model fitted on named columns gets a bare array"""
+    columns = getattr(model, "feature_names_in_", None)
+    return pd.DataFrame(X, columns=columns) if columns is not None else X
+
+def check_parity(reference, candidate: CompiledForest, X: np.ndarray) -> Dict:
+    """Compare class predictions and probabilities of the sklearn and compiled forests"""
+    reference_X = sklearn_input(reference, X)
+    differences = np.abs(reference.predict_proba(reference_X) - candidate.predict_proba(X))
+    return {
+        "samples": len(X),
+        "agreement": float(np.mean(reference.predict(reference_X) == candidate.predict(X))),
+        "max_abs_probability_diff": float(differences.max()),
+    }
+
+def _best_of(fn, repeats: int = 20) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    """Compile the fertilizer model and check prediction parity"""
+    parser = argparse.ArgumentParser(description="Compile the fertilizer random forest into an array-backed model")
+    parser.add_argument("--models-dir", default=os.getenv("MODEL_DIR", "models"))
+    parser.add_argument("--output", help="Output file, defaults to the compiled backend's file in the models directory")
+    parser.add_argument("--samples", type=int, default=5000, help="Synthetic rows for the parity check")
+    parser.add_argument("--min-agreement", type=float, default=1.0,
+                        help="Fail if prediction agreement with the sklearn model is below this")
+    parser.add_argument("--check-only", action="store_true", help="Skip compilation and only run the parity check")
+    args = parser.parse_args()
+
+    sklearn_path = os.path.join(args.models_dir, FERTILIZER_MODEL_FILES["sklearn"])
+    output_path = args.output or os.path.join(args.models_dir, FERTILIZER_MODEL_FILES["compiled"])
+    model, columns = load_sklearn_model(sklearn_path)
+
+    if not args.check_only:
+        print(f"Compiling {sklearn_path} ({len(model.estimators_)} trees)...")
+        forest = compile_forest(model, feature_names=list(columns) if columns is not None else None)
+        save_forest(forest, output_path)
+        print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB, "
+              f"pickle {os.path.getsize(sklearn_path) / 1e6:.1f} MB, {len(forest.threshold)} nodes)")
+
+    forest = load_forest(output_path)
+    report = check_parity(model, forest, synthetic_inputs(forest, args.samples))
+    print(f"Parity on {report['samples']} synthetic rows: agreement {report['agreement']:.2%}, "
+          f"max |dp| {report['max_abs_probability_diff']:.2e}")
+
+    single_row = synthetic_inputs(forest, 1, seed=1)
+    print(f"Load: compiled {_best_of(lambda: load_forest(output_path)) * 1e3:.2f} ms, "
+          f"pickle {_best_of(lambda: load_sklearn_model(sklearn_path), repeats=5) * 1e3:.2f} ms")
+    print(f"Single-row predict: compiled {_best_of(lambda: forest.predict(single_row)) * 1e3:.2f} ms, "
+          f"sklearn {_best_of(lambda: model.predict(sklearn_input(model, single_row))) * 1e3:.2f} ms")
+
+    if report["agreement"] < args.min_agreement:
+        print(f"Agreement is below {args.min_agreement:.2%}, do not switch backends")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
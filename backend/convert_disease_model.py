@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Offline conversion of the plant disease model for CPU inference
+
+Converts models/plant_disease_model.h5 into a quantised TFLite or ONNX
+artifact and checks that it agrees with the Keras model on a sample set:
+
+    python convert_disease_model.py --format tflite --quantization dynamic --samples path/to/images
+    python convert_disease_model.py --format onnx --samples path/to/images
+    python convert_disease_model.py --check-only --format tflite --samples path/to/images
+
+Serve the result by setting DISEASE_MODEL_BACKEND=tflite (or onnx).
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, Iterator, List
+
+import numpy as np
+from PIL import Image
+
+from disease_backends import DISEASE_INPUT_SIZE, DISEASE_MODEL_FILES, load_disease_model, prepare_disease_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+def sample_images(sample_dir: str, limit: int) -> List[np.ndarray]:
+    """Load up to limit preprocessed images from a directory tree"""
+    arrays = []
+    for root, _, files in sorted(os.walk(sample_dir)):
+        for filename in sorted(files):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            with Image.open(os.path.join(root, filename)) as img:
+                arrays.append(prepare_disease_image(img))
+            if len(arrays) >= limit:
+                return arrays
+    return arrays
+
+def convert_to_tflite(keras_path: str, output_path: str, quantization: str, samples: List[np.ndarray]):
+    """Convert the Keras model to TFLite with dynamic-range, float16 or int8 quantisation"""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(keras_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantization != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if not samples:
+            raise ValueError("int8 quantisation needs --samples for calibration")
+
+        def representative_dataset() -> Iterator[List[np.ndarray]]:
+            for sample in samples:
+                yield [sample[np.newaxis].astype(np.float32)]
+
+        converter.representative_dataset = representative_dataset
+
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+def convert_to_onnx(keras_path: str, output_path: str, quantization: str):
+    """Convert the Keras model to ONNX, optionally with dynamic int8 weight quantisation"""
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(keras_path)
+    input_signature = (tf.TensorSpec((None, *DISEASE_INPUT_SIZE, 3), tf.float32, name="input"),)
+
+    float_path = output_path if quantization == "none" else f"{output_path}.fp32"
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=13, output_path=float_path)
+
+    if quantization != "none":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QUInt8)
+        os.remove(float_path)
+
+def check_parity(reference_path: str, candidate_path: str, samples: List[np.ndarray], batch_size: int = 16) -> Dict:
+    """Compare top-1 predictions and probabilities of two disease models on the same samples"""
+    reference = load_disease_model(reference_path)
+    candidate = load_disease_model(candidate_path)
+
+    reference_outputs = []
+    candidate_outputs = []
+    for start in range(0, len(samples), batch_size):
+        batch = np.stack(samples[start:start + batch_size]).astype(np.float32)
+        reference_outputs.append(np.asarray(reference.predict(batch, verbose=0)))
+        candidate_outputs.append(np.asarray(candidate.predict(batch, verbose=0)))
+
+    reference_outputs = np.concatenate(reference_outputs)
+    candidate_outputs = np.concatenate(candidate_outputs)
+    differences = np.abs(reference_outputs - candidate_outputs)
+
+    return {
+        "samples": len(samples),
+        "top1_agreement": float(np.mean(reference_outputs.argmax(axis=1) == candidate_outputs.argmax(axis=1))),
+        "mean_abs_probability_diff": float(differences.mean()),
+        "max_abs_probability_diff": float(differences.max()),
+    }
+
+def main():
+    """Convert the disease model and check accuracy parity"""
+    parser = argparse.ArgumentParser(description="Convert the plant disease model to a quantised CPU backend")
+    parser.add_argument("--format", choices=["tflite", "onnx"], default="tflite")
+    parser.add_argument("--quantization", choices=["none", "dynamic", "float16", "int8"], default="dynamic",
+                        help="float16 and int8 apply to TFLite only; ONNX uses dynamic int8 weights unless 'none'")
+    parser.add_argument("--models-dir", default=os.getenv("MODEL_DIR", "models"))
+    parser.add_argument("--output", help="Output file, defaults to the backend's file in the models directory")
+    parser.add_argument("--samples", help="Directory of sample images for calibration and the parity check")
+    parser.add_argument("--sample-limit", type=int, default=200)
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="Fail if top-1 agreement with the Keras model is below this")
+    parser.add_argument("--check-only", action="store_true", help="Skip conversion and only run the parity check")
+    args = parser.parse_args()
+
+    keras_path = os.path.join(args.models_dir, DISEASE_MODEL_FILES["keras"])
+    output_path = args.output or os.path.join(args.models_dir, DISEASE_MODEL_FILES[args.format])
+    samples = sample_images(args.samples, args.sample_limit) if args.samples else []
+
+    if not args.check_only:
+        print(f"Converting {keras_path} to {args.format} ({args.quantization})...")
+        if args.format == "tflite":
+            convert_to_tflite(keras_path, output_path, args.quantization, samples)
+        else:
+            convert_to_onnx(keras_path, output_path, args.quantization)
+        print(f"Wrote {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB, "
+              f"Keras model {os.path.getsize(keras_path) / 1e6:.1f} MB)")
+
+    if not samples:
+        print("No --samples given, skipping the parity check")
+        return
+
+    report = check_parity(keras_path, output_path, samples)
+    print(f"Parity on {report['samples']} samples: top-1 agreement {report['top1_agreement']:.2%}, "
+          f"mean |dp| {report['mean_abs_probability_diff']:.4f}, max |dp| {report['max_abs_probability_diff']:.4f}")
+
+    if report["top1_agreement"] < args.min_agreement:
+        print(f"Top-1 agreement is below {args.min_agreement:.2%}, do not switch backends")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
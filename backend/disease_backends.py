@@ -0,0 +1,102 @@
+"""
+Inference backends for the plant disease model
+
+The disease model can be served from the original Keras file or from a
+quantised TFLite / ONNX artifact produced by convert_disease_model.py.
+Every backend exposes the same ``predict(batch, verbose=0)`` call as a Keras
+model, so MLModelManager and the inference queue do not care which one is
+active. TensorFlow is only imported when the Keras backend (or the stock TF
+Lite interpreter) is actually used.
+"""
+
+import os
+import threading
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+
+DISEASE_INPUT_SIZE = (224, 224)
+
+# Backend name -> model file in the models directory
+DISEASE_MODEL_FILES: Dict[str, str] = {
+    "keras": "plant_disease_model.h5",
+    "tflite": "plant_disease_model.tflite",
+    "onnx": "plant_disease_model.onnx"
+}
+
+def prepare_disease_image(img: Image.Image) -> np.ndarray:
+    """Turn a PIL image into a normalized 224x224 RGB array"""
+    # Let the JPEG decoder downscale while decoding instead of decoding full resolution
+    img.draft("RGB", DISEASE_INPUT_SIZE)
+    img = img.convert("RGB").resize(DISEASE_INPUT_SIZE)  # Adjust size based on your model's requirements
+    img_array = np.asarray(img, dtype="float32")
+    return img_array / 255.0  # Normalize
+
+class TFLiteDiseaseModel:
+    """Disease model served by a (possibly quantised) TFLite interpreter"""
+
+    def __init__(self, path: str, num_threads: int = None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+        # A TFLite interpreter must not be invoked from two threads at once
+        self._lock = threading.Lock()
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], list(batch.shape))
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+
+            input_dtype = self._input["dtype"]
+            if input_dtype != np.float32:
+                # Fully integer-quantised input
+                scale, zero_point = self._input["quantization"]
+                batch = np.round(batch / scale + zero_point)
+            self.interpreter.set_tensor(self._input["index"], batch.astype(input_dtype))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output["index"])
+
+        if self._output["dtype"] != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+class ONNXDiseaseModel:
+    """Disease model served by ONNX Runtime"""
+
+    def __init__(self, path: str, num_threads: int = None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        return self.session.run(None, {self._input_name: batch.astype(np.float32)})[0]
+
+def load_disease_model(path: str, num_threads: int = None):
+    """Load a disease model, picking the backend from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".tflite":
+        return TFLiteDiseaseModel(path, num_threads=num_threads)
+    if extension == ".onnx":
+        return ONNXDiseaseModel(path, num_threads=num_threads)
+    import tensorflow as tf
+    if num_threads:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError:
+            # TensorFlow was already initialised in this process, keep its thread pools
+            pass
+    return tf.keras.models.load_model(path)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Streaming export of farm history for Agricultural Advisory System
+
+Streams recommendations, weather readings or disease detections for one or
+more farms as NDJSON or CSV. Rows are read through a server-side cursor in
+batches and written out as they arrive, so memory use does not grow with the
+size of the export. Used by the /export endpoint and from the command line:
+
+    python export.py weather --farm-id 1 --farm-id 2 --since 2024-01-01 --format csv > weather.csv
+    python export.py all --farm-id 1 --output-dir exports/
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import DiseaseDetection, Recommendation, WeatherData
+
+load_dotenv()
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Dataset name -> (model, timestamp column used for the time range and ordering)
+EXPORT_DATASETS = {
+    "recommendations": (Recommendation, Recommendation.created_at),
+    "weather": (WeatherData, WeatherData.recorded_at),
+    "disease_detections": (DiseaseDetection, DiseaseDetection.detection_date),
+}
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def stream_rows(
+    dataset: str,
+    farm_ids: Sequence[int],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[Sequence[Dict]]:
+    """Yield batches of rows (as dicts) ordered by farm, time and id"""
+    model, time_column = EXPORT_DATASETS[dataset]
+    table = model.__table__
+
+    query = select(table).where(table.c.farm_id.in_(farm_ids))
+    if since:
+        query = query.where(time_column >= since)
+    if until:
+        query = query.where(time_column < until)
+    query = query.order_by(table.c.farm_id, time_column, table.c.id).execution_options(yield_per=batch_size)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.mappings().partitions():
+            yield partition
+
+async def export_lines(
+    dataset: str,
+    farm_ids: Sequence[int],
+    export_format: str = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[str]:
+    """Yield the export as text chunks, one chunk per batch of rows"""
+    columns = [column.name for column in EXPORT_DATASETS[dataset][0].__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    if export_format == "csv":
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    async for rows in stream_rows(dataset, farm_ids, since, until, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            if export_format == "csv":
+                writer.writerow(["" if row[name] is None else _serialize(row[name]) for name in columns])
+            else:
+                buffer.write(json.dumps({name: _serialize(row[name]) for name in columns}))
+                buffer.write("\n")
+        yield buffer.getvalue()
+
+def main():
+    """Export farm history from the command line"""
+    parser = argparse.ArgumentParser(description="Export farm history as NDJSON or CSV")
+    parser.add_argument("dataset", choices=[*EXPORT_DATASETS, "all"])
+    parser.add_argument("--farm-id", type=int, action="append", dest="farm_ids", required=True, help="Farm to export, can be repeated")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Start of the time range (inclusive)")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="End of the time range (exclusive)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--output-dir", default=None, help="Write <dataset>.<format> files here instead of stdout")
+    args = parser.parse_args()
+
+    datasets = list(EXPORT_DATASETS) if args.dataset == "all" else [args.dataset]
+    if len(datasets) > 1 and not args.output_dir:
+        parser.error("exporting all datasets needs --output-dir")
+
+    async def run():
+        for dataset in datasets:
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+                output = open(os.path.join(args.output_dir, f"{dataset}.{args.format}"), "w", newline="")
+            else:
+                output = sys.stdout
+            try:
+                async for chunk in export_lines(dataset, args.farm_ids, args.format, args.since, args.until):
+                    output.write(chunk)
+            finally:
+                if output is not sys.stdout:
+                    output.close()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Array-backed random forest for the fertilizer model
+
+A fitted sklearn RandomForestClassifier is flattened into a few contiguous
+NumPy arrays (split feature, threshold, right child and per-node class
+probabilities for every node of every tree) and written to a single
+memory-mappable file. CompiledForest evaluates all trees for a whole batch
+with vectorised NumPy gathers, one step per tree level, and predicts exactly
+what the sklearn model predicts: loading is an mmap instead of an unpickle,
+and neither sklearn nor its per-call input validation is involved.
+
+Nodes are numbered in preorder, so a left child is always the next node and
+only right children need to be stored. Leaves have a threshold of -inf;
+each level only advances the (tree, row) pairs that have not reached one.
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# FERTILIZER_MODEL_BACKEND -> file in MODEL_DIR
+FERTILIZER_MODEL_FILES = {
+    "sklearn": "fertilizer_model.pkl",
+    "compiled": "fertilizer_model.forest",
+}
+
+FOREST_MAGIC = b"NPFOREST1\n"
+ARRAY_ALIGNMENT = 64
+EVALUATION_CHUNK_ROWS = 1024
+
+class CompiledForest:
+    """Pure-NumPy evaluator with the predict/predict_proba interface of the sklearn forest"""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, right: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, classes: Sequence,
+                 feature_names: Optional[Sequence[str]] = None, n_features: Optional[int] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object) if feature_names is not None else None
+        self.n_features_in_ = int(n_features if n_features is not None else int(feature.max()) + 1)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X) -> np.ndarray:
+        """Leaf node index reached in every tree, shape (n_trees, n_samples)"""
+        # sklearn trees compare float32 inputs against float64 thresholds; do the same
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features_in_}), got {X.shape}")
+        n_samples, n_features = X.shape
+        values = X.ravel()
+
+        # One entry per (tree, row) pair, tree-major
+        nodes = np.repeat(self.roots, n_samples)
+        active = np.arange(nodes.size)
+        current = nodes.copy()
+        row_starts = np.tile(np.arange(n_samples) * n_features, len(self.roots))
+        while active.size:
+            threshold = self.threshold[current]
+            internal = threshold != -np.inf
+            if not internal.all():
+                active, current, row_starts, threshold = (
+                    active[internal], current[internal], row_starts[internal], threshold[internal]
+                )
+            go_left = values[row_starts + self.feature[current]] <= threshold
+            current = np.where(go_left, current + 1, self.right[current])
+            nodes[active] = current
+        return nodes.reshape(len(self.roots), n_samples)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Mean of the per-tree class probabilities, shape (n_samples, n_classes)"""
+        X = np.asarray(X, dtype=np.float32)
+        # Large batches go in chunks so the (n_trees, rows, n_classes) temporary stays small
+        chunks = [
+            self.value[self.apply(X[start:start + EVALUATION_CHUNK_ROWS])].sum(axis=0)
+            for start in range(0, X.shape[0], EVALUATION_CHUNK_ROWS)
+        ]
+        proba = np.concatenate(chunks) if len(chunks) != 1 else chunks[0]
+        return proba / self.n_estimators
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def compile_forest(model, feature_names: Optional[Sequence[str]] = None) -> CompiledForest:
+    """Flatten a fitted single-output sklearn forest (or a single decision tree) classifier"""
+    estimators = getattr(model, "estimators_", None) or [model]
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output classifiers can be compiled")
+    if feature_names is None and getattr(model, "feature_names_in_", None) is not None:
+        feature_names = list(model.feature_names_in_)
+
+    features, thresholds, rights, values, roots = [], [], [], [], []
+    offset = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        order = _preorder(tree.children_left, tree.children_right)
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        children_left = tree.children_left[order]
+        children_right = tree.children_right[order]
+        is_leaf = children_left < 0
+        index = np.arange(offset, offset + len(order), dtype=np.int32)
+
+        features.append(np.where(is_leaf, 0, tree.feature[order]).astype(np.int32))
+        thresholds.append(np.where(is_leaf, -np.inf, tree.threshold[order]).astype(np.float64))
+        rights.append(np.where(is_leaf, index, position[children_right] + offset).astype(np.int32))
+
+        # Normalise per node like DecisionTreeClassifier.predict_proba does
+        node_values = tree.value[order, 0, :].astype(np.float64)
+        totals = node_values.sum(axis=1, keepdims=True)
+        totals[totals == 0.0] = 1.0
+        values.append(node_values / totals)
+
+        roots.append(offset)
+        offset += len(order)
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int32),
+        classes=model.classes_,
+        feature_names=feature_names,
+        n_features=model.n_features_in_
+    )
+
+def _preorder(children_left: np.ndarray, children_right: np.ndarray) -> np.ndarray:
+    """Node ids of one tree in preorder (node, left subtree, right subtree)"""
+    order = []
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if children_left[node] >= 0:
+            stack.append(children_right[node])
+            stack.append(children_left[node])
+    return np.asarray(order, dtype=np.intp)
+
+FOREST_ARRAYS = ("feature", "threshold", "right", "value", "roots")
+
+def save_forest(forest: CompiledForest, path: str):
+    """
+    Write the forest as: magic, 8-byte header length, JSON header, then each
+    array's raw bytes at a 64-byte aligned offset recorded in the header.
+    The file is replaced atomically.
+    """
+    arrays = {name: np.ascontiguousarray(getattr(forest, name)) for name in FOREST_ARRAYS}
+    header: Dict = {
+        "classes": forest.classes_.tolist(),
+        "feature_names": forest.feature_names_in_.tolist() if forest.feature_names_in_ is not None else None,
+        "n_features": forest.n_features_in_,
+        "arrays": {},
+    }
+
+    # Offsets depend on the header size, which depends on the offsets; two passes settle it
+    data_start = 0
+    for _ in range(2):
+        offset = data_start
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        header_bytes = json.dumps(header).encode()
+        data_start = _align(len(FOREST_MAGIC) + 8 + len(header_bytes))
+
+    # Running servers memory-map the current file, so never rewrite it in place:
+    # write a new file next to it and rename it over the old one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(FOREST_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(header["arrays"][name]["offset"])
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def load_forest(path: str) -> CompiledForest:
+    """Memory-map a forest written by save_forest; the arrays are read-only views of the file"""
+    with open(path, "rb") as f:
+        if f.read(len(FOREST_MAGIC)) != FOREST_MAGIC:
+            raise ValueError(f"{path} is not a compiled forest file")
+        header = json.loads(f.read(int.from_bytes(f.read(8), "little")))
+
+    # Plain ndarray views of the mapping: indexing np.memmap subclasses is noticeably slower
+    data = np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+    arrays = {}
+    for name in FOREST_ARRAYS:
+        spec = header["arrays"][name]
+        dtype = np.dtype(spec["dtype"])
+        size = int(np.prod(spec["shape"])) * dtype.itemsize
+        arrays[name] = data[spec["offset"]:spec["offset"] + size].view(dtype).reshape(spec["shape"])
+
+    return CompiledForest(
+        **arrays,
+        classes=header["classes"],
+        feature_names=header["feature_names"],
+        n_features=header["n_features"]
+    )
+
+def _align(offset: int) -> int:
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
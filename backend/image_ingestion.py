@@ -0,0 +1,99 @@
+"""
+Upload ingestion for disease detection images
+
+Uploads are read in chunks with a size cap and hashed as the bytes arrive,
+so the image can be decoded straight from memory. The original file is
+written to disk afterwards, off the request path.
+
+Starlette parses the whole multipart body, spooling file parts over 1 MB to
+a temporary file, before the endpoint runs. UploadLimitMiddleware therefore
+caps multipart request bodies while they are received, and read_upload
+checks the image itself.
+"""
+
+import hashlib
+import os
+from typing import Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 256 * 1024
+# Multipart boundaries, part headers and the other form fields on top of the image
+MAX_FORM_OVERHEAD_BYTES = 64 * 1024
+
+def _too_large(max_bytes: int) -> str:
+    return f"Image exceeds the {max_bytes // (1024 * 1024)} MB upload limit"
+
+async def read_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[bytes, str]:
+    """Read an upload into memory, enforcing a size cap, and return (bytes, sha256 hex digest)"""
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=_too_large(max_bytes)
+            )
+        digest.update(chunk)
+        chunks.append(chunk)
+
+    return b"".join(chunks), digest.hexdigest()
+
+def save_upload(file_path: str, data: bytes):
+    """Persist an uploaded file; meant to run as a background task"""
+    try:
+        with open(file_path, "wb") as buffer:
+            buffer.write(data)
+    except OSError as e:
+        print(f"Error saving upload {file_path}: {e}")
+
+class UploadLimitMiddleware:
+    """ASGI middleware rejecting oversized multipart bodies before they are parsed or spooled"""
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_bytes + MAX_FORM_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope["headers"]) if scope["type"] == "http" else {}
+        if not headers.get(b"content-type", b"").startswith(b"multipart/"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            response = JSONResponse(
+                {"detail": _too_large(self.max_bytes)},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            # Covers chunked uploads and a Content-Length that understates the body
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=_too_large(self.max_bytes)
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,275 @@
+"""
+Disease model inference process pool
+
+Runs the disease model in dedicated worker processes instead of the API
+process, so model compute never competes with request handling for the GIL
+and the API process does not hold a copy of the model. Each worker owns one
+shared-memory input buffer: the API side copies a preprocessed batch into it
+and only sends the batch size over the worker's pipe. The (small) class
+probabilities come back over the same pipe.
+
+The pool exposes ``predict(batch, verbose=0)`` like a Keras model, so
+MLModelManager uses it in place of an in-process disease model.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from disease_backends import DISEASE_INPUT_SIZE, load_disease_model
+
+DISEASE_INPUT_SHAPE = (*DISEASE_INPUT_SIZE, 3)
+WORKER_NAME_PREFIX = "disease-inference-"
+
+def in_inference_worker() -> bool:
+    """True inside a pool worker, including while it re-imports the parent's __main__ module"""
+    return multiprocessing.current_process().name.startswith(WORKER_NAME_PREFIX)
+
+def _worker_main(conn, shm_name: str, max_batch_size: int, input_shape: Tuple[int, ...],
+                 num_threads: Optional[int], cpus: Optional[Sequence[int]]):
+    """Worker process loop: load the model on request and predict batches from shared memory"""
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    inputs = np.ndarray((max_batch_size, *input_shape), dtype=np.float32, buffer=shm.buf)
+    model = None
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        command = message[0]
+        if command == "stop":
+            break
+        try:
+            if command == "load":
+                model = load_disease_model(message[1], num_threads=num_threads)
+                model.predict(np.zeros((1, *input_shape), dtype=np.float32), verbose=0)
+                conn.send(("ok", None))
+            elif command == "predict":
+                if model is None:
+                    raise RuntimeError("No disease model loaded in inference worker")
+                conn.send(("ok", np.asarray(model.predict(inputs[:message[1]], verbose=0))))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    del inputs
+    shm.close()
+
+class _PoolWorker:
+    """Parent-side handle for one worker process and its shared input buffer"""
+
+    def __init__(self, index: int, process, conn, shm: shared_memory.SharedMemory, max_batch_size: int):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.shm = shm
+        self.inputs = np.ndarray((max_batch_size, *DISEASE_INPUT_SHAPE), dtype=np.float32, buffer=shm.buf)
+        self.batches = 0
+        self.requests = 0
+
+    def call(self, message: Tuple):
+        self.conn.send(message)
+        status, value = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+class InferenceProcessPool:
+    """
+    Fixed-size pool of disease model worker processes.
+
+    Each process runs with ``threads_per_process`` inference threads and, if
+    ``pin_cpus`` is set, is pinned to its own slice of CPUs. Callers borrow
+    an idle worker for each batch, so up to ``processes`` batches run in
+    parallel. Workers that die are restarted with the current model; a
+    worker that cannot be restarted is dropped, and the next load() starts
+    a new process in its slot.
+    """
+
+    def __init__(self, processes: int, threads_per_process: Optional[int] = None,
+                 max_batch_size: int = 16, pin_cpus: bool = False):
+        self.processes = max(1, processes)
+        self.threads_per_process = threads_per_process
+        self.max_batch_size = max(1, max_batch_size)
+        self.pin_cpus = pin_cpus
+        self.model_path: Optional[str] = None
+        self.restarts = 0
+        self.total_inference_seconds = 0.0
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _PoolWorker] = {}
+        self._idle: "queue.Queue[_PoolWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _worker_cpus(self, index: int) -> Optional[List[int]]:
+        if not self.pin_cpus or not hasattr(os, "sched_getaffinity"):
+            return None
+        available = sorted(os.sched_getaffinity(0))
+        per_worker = self.threads_per_process or max(1, len(available) // self.processes)
+        start = index * per_worker
+        return [available[(start + i) % len(available)] for i in range(per_worker)]
+
+    def _start_worker(self, index: int) -> _PoolWorker:
+        shm = shared_memory.SharedMemory(
+            create=True, size=self.max_batch_size * int(np.prod(DISEASE_INPUT_SHAPE)) * 4
+        )
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, shm.name, self.max_batch_size, DISEASE_INPUT_SHAPE,
+                  self.threads_per_process, self._worker_cpus(index)),
+            name=f"{WORKER_NAME_PREFIX}{index}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _PoolWorker(index, process, parent_conn, shm, self.max_batch_size)
+
+    def _stop_worker(self, worker: _PoolWorker, timeout: float = 5.0):
+        try:
+            worker.conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        worker.process.join(timeout)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join()
+        worker.conn.close()
+        del worker.inputs
+        worker.shm.close()
+        worker.shm.unlink()
+
+    def _restart_worker(self, worker: _PoolWorker) -> _PoolWorker:
+        """
+        Replace a dead worker with a fresh process running the current model.
+        If that fails the worker is removed from the pool and the error raised.
+        """
+        replacement = None
+        try:
+            self._stop_worker(worker, timeout=0)
+            replacement = self._start_worker(worker.index)
+            if self.model_path is not None:
+                replacement.call(("load", self.model_path))
+        except Exception:
+            self._workers.pop(worker.index, None)
+            if replacement is not None:
+                self._stop_worker(replacement, timeout=0)
+            print(f"Removed disease inference worker {worker.index}, {len(self._workers)} left")
+            raise
+        self._workers[worker.index] = replacement
+        self.restarts += 1
+        print(f"Restarted disease inference worker {worker.index}")
+        return replacement
+
+    def _borrow(self) -> _PoolWorker:
+        # Time out periodically so callers notice when the last worker was removed
+        while self._workers:
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+        raise RuntimeError("No disease inference workers are running")
+
+    def _borrow_all(self) -> List[_PoolWorker]:
+        """Wait until every live worker is idle and take them all"""
+        borrowed = []
+        # Re-read the live count each time: a worker removed meanwhile never comes back to the queue
+        while len(borrowed) < len(self._workers):
+            try:
+                borrowed.append(self._idle.get(timeout=1.0))
+            except queue.Empty:
+                continue
+        return borrowed
+
+    def load(self, path: str) -> "InferenceProcessPool":
+        """
+        Start the workers if needed, including ones dropped after a failed
+        restart, and load (or reload) the model in every one of them. Workers
+        are only reloaded once their in-flight batch has finished, and a
+        failed reload puts the previous model back.
+        """
+        with self._lock:
+            workers = self._borrow_all()
+            try:
+                for index in range(self.processes):
+                    if index not in self._workers:
+                        self._workers[index] = self._start_worker(index)
+                        workers.append(self._workers[index])
+
+                for worker in workers:
+                    worker.conn.send(("load", path))
+                errors = [value for status, value in (worker.conn.recv() for worker in workers) if status == "error"]
+                if errors:
+                    if self.model_path is not None:
+                        for worker in workers:
+                            worker.call(("load", self.model_path))
+                    raise RuntimeError(errors[0])
+                self.model_path = path
+            finally:
+                for worker in workers:
+                    self._idle.put(worker)
+        return self
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """Run a preprocessed batch on an idle worker, blocking until it is done"""
+        if len(batch) > self.max_batch_size:
+            return np.concatenate([
+                self.predict(batch[start:start + self.max_batch_size])
+                for start in range(0, len(batch), self.max_batch_size)
+            ])
+
+        worker = self._borrow()
+        started = time.perf_counter()
+        try:
+            worker.inputs[:len(batch)] = batch
+            return worker.call(("predict", len(batch)))
+        except (EOFError, OSError):
+            try:
+                worker = self._restart_worker(worker)
+            except Exception as e:
+                print(f"Error restarting disease inference worker {worker.index}: {e}")
+                worker = None
+            raise RuntimeError("Disease inference worker exited during prediction")
+        finally:
+            with self._stats_lock:
+                self.total_inference_seconds += time.perf_counter() - started
+            # Only a live (or successfully restarted) worker goes back to the idle queue
+            if worker is not None:
+                worker.batches += 1
+                worker.requests += len(batch)
+                self._idle.put(worker)
+
+    def close(self):
+        """Stop every worker and release the shared memory"""
+        with self._lock:
+            workers = self._borrow_all()
+            for worker in workers:
+                self._stop_worker(worker)
+            self._workers = {}
+
+    def get_stats(self) -> Dict:
+        workers = list(self._workers.values())
+        return {
+            "processes": len(workers),
+            "configured_processes": self.processes,
+            "threads_per_process": self.threads_per_process,
+            "alive_processes": sum(worker.process.is_alive() for worker in workers),
+            "idle_processes": self._idle.qsize(),
+            "restarts": self.restarts,
+            "model_path": self.model_path,
+            "total_inference_seconds": round(self.total_inference_seconds, 3),
+            "workers": [
+                {"index": worker.index, "pid": worker.process.pid, "batches": worker.batches, "requests": worker.requests}
+                for worker in workers
+            ],
+        }
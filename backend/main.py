@@ -1,167 +1,149 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
+import numpy as np
+import asyncio
 import os
-import shutil
 from datetime import datetime, timedelta
 
-from database import get_db, engine
-from models import Base, Farmer, Farm, Crop, Recommendation, WeatherData, DiseaseDetection
+from database import get_async_db
+from models import Farmer, Farm, Crop, Recommendation, WeatherData, DiseaseDetection
 from schemas import (
     FarmerCreate, FarmerLogin, Farmer as FarmerSchema, Token,
-    FarmCreate, Farm as FarmSchema,
+    FarmCreate, Farm as FarmSchema, FarmOverview, FarmsOverview,
     CropCreate, Crop as CropSchema,
     Recommendation as RecommendationSchema,
-    IrrigationRecommendation, FertilizerRecommendation, PestDetectionResult
+    IrrigationRecommendation, FertilizerRecommendation, PestDetectionResult,
+    CropIrrigationPlan, DailyIrrigationPlan, CropFertilizerRecommendation, SoilSample
 )
 from auth import (
     authenticate_farmer, create_access_token, get_current_farmer,
-    get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_password_hash_async, principal_cache, require_admin_token, ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from ml_models import ml_manager
+from ml_models import ml_manager, irrigation_reason
 from weather_service import weather_service
+from scheduler import recommendation_scheduler
+from write_behind import telemetry_writer
+from pagination import fetch_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from export import export_lines, EXPORT_DATASETS, EXPORT_FORMATS
+from image_ingestion import UploadLimitMiddleware, read_upload, save_upload
+from metrics import REGISTRY, MetricsMiddleware
+from profiling import ProfilingMiddleware, PROFILE_ID_HEADER, list_profiles, profile_path, require_profiling_token
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# The upstream forecast covers five days of 3-hourly entries
+MAX_FORECAST_DAYS = 5
 
-async def generate_automatic_recommendations(farm_id: int, db: Session):
-    """Generate automatic recommendations based on farm conditions"""
-    # Check if recommendations already exist for today
-    today = datetime.now().date()
-    existing_recommendations = db.query(Recommendation).filter(
-        Recommendation.farm_id == farm_id,
-        Recommendation.created_at >= today
-    ).count()
+def daily_forecast(forecast_data: Optional[dict], days: int) -> List[tuple]:
+    """Aggregate 3-hourly forecast entries into (date, mean temperature, mean humidity, total rainfall) per day"""
+    daily = {}
+    for item in (forecast_data or {}).get("forecast", []):
+        day = item["datetime"][:10]
+        if day not in daily:
+            if len(daily) == days:
+                break
+            daily[day] = []
+        daily[day].append(item)
     
-    if existing_recommendations > 0:
-        return  # Already generated recommendations for today
+    return [
+        (
+            day,
+            float(np.mean([item["temperature"] for item in items])),
+            float(np.mean([item["humidity"] for item in items])),
+            float(np.sum([item["rainfall"] for item in items]))
+        )
+        for day, items in daily.items()
+    ]
+
+async def build_irrigation_plans(farms: List[Farm], days: int = 0) -> List[CropIrrigationPlan]:
+    """Compute irrigation plans for every crop on the given farms in one vectorised call"""
+    farm_crops = [(farm, crop) for farm in farms for crop in farm.crops]
+    if not farm_crops:
+        return []
     
-    # Get farm and its crops
-    farm = db.query(Farm).filter(Farm.id == farm_id).first()
-    if not farm:
-        return
+    farms_with_crops = [farm for farm in farms if farm.crops]
+    coordinates = [(farm.latitude, farm.longitude) for farm in farms_with_crops]
+    weather = {
+        farm.id: reading or {}
+        for farm, reading in zip(farms_with_crops, await weather_service.get_current_weather_many(coordinates))
+    }
+    temperature = np.array([weather[farm.id].get("temperature", 25) for farm, _ in farm_crops], dtype=float)
+    humidity = np.array([weather[farm.id].get("humidity", 60) for farm, _ in farm_crops], dtype=float)
+    rainfall = np.array([weather[farm.id].get("rainfall", 0) for farm, _ in farm_crops], dtype=float)
+    stages = np.array([crop.current_stage for _, crop in farm_crops], dtype=object)
+    soils = np.array([farm.soil_type for farm, _ in farm_crops], dtype=object)
     
-    crops = db.query(Crop).filter(Crop.farm_id == farm_id).all()
-    if not crops:
-        return
+    schedule = ml_manager.predict_irrigation_schedule_batch(temperature, humidity, rainfall, stages, soils)
     
-    # Get current weather data
-    try:
-        weather_data = weather_service.get_current_weather(farm.latitude, farm.longitude)
-        
-        # Generate weather-based recommendations
-        if weather_data.get('temperature', 0) > 35:
-            recommendation = Recommendation(
-                farm_id=farm_id,
-                crop_id=crops[0].id,  # Use first crop as reference
-                recommendation_type="irrigation",
-                title="High Temperature Alert",
-                description=f"Temperature is {weather_data.get('temperature', 0):.1f}°C. Consider increasing irrigation frequency to prevent heat stress.",
-                priority="high",
-                status="pending"
-            )
-            db.add(recommendation)
-        
-        if weather_data.get('humidity', 0) < 30:
-            recommendation = Recommendation(
-                farm_id=farm_id,
-                crop_id=crops[0].id,
-                recommendation_type="irrigation",
-                title="Low Humidity Alert",
-                description=f"Humidity is {weather_data.get('humidity', 0):.1f}%. Consider misting or increasing irrigation to maintain soil moisture.",
-                priority="medium",
-                status="pending"
-            )
-            db.add(recommendation)
-        
-        if weather_data.get('wind_speed', 0) > 15:
-            recommendation = Recommendation(
-                farm_id=farm_id,
-                crop_id=crops[0].id,
-                recommendation_type="general",
-                title="High Wind Warning",
-                description=f"Wind speed is {weather_data.get('wind_speed', 0):.1f} km/h. Consider protecting young plants and checking irrigation systems.",
-                priority="medium",
-                status="pending"
+    # Per-day plans over the forecast horizon, as a (crops, days) grid
+    forecasts = {}
+    if days > 0:
+        forecasts = {
+            farm.id: daily_forecast(forecast_data, days)
+            for farm, forecast_data in zip(
+                farms_with_crops, await weather_service.get_weather_forecast_many(coordinates, days)
             )
-            db.add(recommendation)
-            
-    except Exception as e:
-        print(f"Error getting weather data for recommendations: {e}")
-    
-    # Generate crop-based recommendations
-    for crop in crops:
-        # Check crop stage and generate appropriate recommendations
-        if crop.current_stage == "seedling":
-            recommendation = Recommendation(
-                farm_id=farm_id,
-                crop_id=crop.id,
-                recommendation_type="fertilizer",
-                title="Seedling Stage Care",
-                description=f"Your {crop.crop_name} is in seedling stage. Apply light fertilizer and ensure consistent moisture.",
-                priority="medium",
-                status="pending"
-            )
-            db.add(recommendation)
-        
-        elif crop.current_stage == "flowering":
-            recommendation = Recommendation(
-                farm_id=farm_id,
-                crop_id=crop.id,
-                recommendation_type="fertilizer",
-                title="Flowering Stage Nutrition",
-                description=f"Your {crop.crop_name} is flowering. Apply phosphorus-rich fertilizer to support flower development.",
-                priority="high",
-                status="pending"
-            )
-            db.add(recommendation)
-        
-        elif crop.current_stage == "fruiting":
-            recommendation = Recommendation(
-                farm_id=farm_id,
-                crop_id=crop.id,
-                recommendation_type="irrigation",
-                title="Fruiting Stage Watering",
-                description=f"Your {crop.crop_name} is fruiting. Maintain consistent soil moisture for optimal fruit development.",
-                priority="high",
-                status="pending"
+        }
+        grid = np.full((len(farm_crops), days, 3), np.nan)
+        for i, (farm, _) in enumerate(farm_crops):
+            for j, (_, *values) in enumerate(forecasts[farm.id]):
+                grid[i, j] = values
+        forecast_schedule = ml_manager.predict_irrigation_schedule_batch(
+            grid[..., 0], grid[..., 1], grid[..., 2], stages[:, None], soils[:, None]
+        )
+    
+    plans = []
+    for i, (farm, crop) in enumerate(farm_crops):
+        forecast = [
+            DailyIrrigationPlan(
+                date=day,
+                recommended_water_amount=round(float(forecast_schedule["recommended_water_amount"][i, j]), 2),
+                frequency=str(forecast_schedule["frequency"][i, j]),
+                best_time=str(forecast_schedule["best_time"][i, j]),
+                reason=irrigation_reason(round(day_temperature, 1), round(day_humidity, 1), round(day_rainfall, 1), crop.current_stage)
             )
-            db.add(recommendation)
+            for j, (day, day_temperature, day_humidity, day_rainfall) in enumerate(forecasts.get(farm.id, []))
+        ]
+        plans.append(CropIrrigationPlan(
+            farm_id=farm.id,
+            crop_id=crop.id,
+            crop_name=crop.crop_name,
+            recommended_water_amount=round(float(schedule["recommended_water_amount"][i]), 2),
+            frequency=str(schedule["frequency"][i]),
+            best_time=str(schedule["best_time"][i]),
+            reason=irrigation_reason(temperature[i], humidity[i], rainfall[i], crop.current_stage),
+            forecast=forecast
+        ))
     
-    # Generate soil-based recommendations
-    if farm.soil_type == "sandy":
-        recommendation = Recommendation(
-            farm_id=farm_id,
-            crop_id=crops[0].id,
-            recommendation_type="fertilizer",
-            title="Sandy Soil Management",
-            description="Sandy soil drains quickly. Consider adding organic matter and applying fertilizer in smaller, more frequent doses.",
-            priority="medium",
-            status="pending"
-        )
-        db.add(recommendation)
+    return plans
+
+def build_fertilizer_recommendations(farms: List[Farm]) -> List[CropFertilizerRecommendation]:
+    """Compute fertilizer recommendations for every crop on the given farms in one model call"""
+    farm_crops = [(farm, crop) for farm in farms for crop in farm.crops]
+    soil_samples = [
+        {
+            "soil_type": farm.soil_type,
+            "crop_type": crop.crop_name,
+            "area_acres": crop.area_planted
+        }
+        for farm, crop in farm_crops
+    ]
     
-    elif farm.soil_type == "clay":
-        recommendation = Recommendation(
-            farm_id=farm_id,
-            crop_id=crops[0].id,
-            recommendation_type="irrigation",
-            title="Clay Soil Management",
-            description="Clay soil retains water well. Be careful not to overwater and ensure good drainage.",
-            priority="medium",
-            status="pending"
-        )
-        db.add(recommendation)
-    
-    # Commit all recommendations
-    try:
-        db.commit()
-        print(f"Generated automatic recommendations for farm {farm_id}")
-    except Exception as e:
-        db.rollback()
-        print(f"Error saving recommendations: {e}")
+    recommendations = ml_manager.predict_fertilizer_recommendations(soil_samples)
+    
+    return [
+        CropFertilizerRecommendation(
+            farm_id=farm.id,
+            crop_id=crop.id,
+            crop_name=crop.crop_name,
+            **recommendation
+        )
+        for (farm, crop), recommendation in zip(farm_crops, recommendations)
+    ]
 
 app = FastAPI(
     title="Agricultural Advisory System",
@@ -169,6 +151,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Reject oversized uploads before Starlette parses and spools them
+app.add_middleware(UploadLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -176,16 +161,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, PROFILE_ID_HEADER],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # Create uploads directory
 os.makedirs("uploads", exist_ok=True)
 
+@app.on_event("startup")
+async def start_background_workers():
+    await weather_service.start()
+    recommendation_scheduler.start()
+    telemetry_writer.start()
+    ml_manager.start_model_watcher()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await recommendation_scheduler.stop()
+    await telemetry_writer.stop()
+    ml_manager.shutdown()
+    await weather_service.aclose()
+
 @app.post("/auth/register", response_model=FarmerSchema)
-async def register_farmer(farmer: FarmerCreate, db: Session = Depends(get_db)):
+async def register_farmer(farmer: FarmerCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new farmer"""
     # Check if farmer already exists
-    existing_farmer = db.query(Farmer).filter(Farmer.email == farmer.email).first()
+    result = await db.execute(
+        select(Farmer).filter(Farmer.email == farmer.email)
+    )
+    existing_farmer = result.scalars().first()
     if existing_farmer:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -193,7 +198,7 @@ async def register_farmer(farmer: FarmerCreate, db: Session = Depends(get_db)):
         )
     
     # Create new farmer
-    hashed_password = get_password_hash(farmer.password)
+    hashed_password = await get_password_hash_async(farmer.password)
     db_farmer = Farmer(
         name=farmer.name,
         email=farmer.email,
@@ -203,15 +208,15 @@ async def register_farmer(farmer: FarmerCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_farmer)
-    db.commit()
-    db.refresh(db_farmer)
+    await db.commit()
+    await db.refresh(db_farmer)
     
     return db_farmer
 
 @app.post("/auth/login", response_model=Token)
-async def login_farmer(farmer_login: FarmerLogin, db: Session = Depends(get_db)):
+async def login_farmer(farmer_login: FarmerLogin, db: AsyncSession = Depends(get_async_db)):
     """Login farmer and return access token"""
-    farmer = authenticate_farmer(db, farmer_login.email, farmer_login.password)
+    farmer = await authenticate_farmer(db, farmer_login.email, farmer_login.password)
     if not farmer:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -236,7 +241,7 @@ async def get_current_farmer_info(current_farmer: Farmer = Depends(get_current_f
 async def create_farm(
     farm: FarmCreate,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new farm"""
     db_farm = Farm(
@@ -249,36 +254,120 @@ async def create_farm(
     )
     
     db.add(db_farm)
-    db.commit()
-    db.refresh(db_farm)
+    await db.commit()
+    await db.refresh(db_farm)
+    await db.refresh(db_farm, ["crops"])
     
     return db_farm
 
 @app.get("/farms", response_model=List[FarmSchema])
 async def get_farms(
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all farms for current farmer"""
-    farms = db.query(Farm).filter(Farm.farmer_id == current_farmer.id).all()
-    
-    # Load crops for each farm
-    for farm in farms:
-        farm.crops = db.query(Crop).filter(Crop.farm_id == farm.id).all()
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(Farm.farmer_id == current_farmer.id)
+    )
+    farms = result.scalars().all()
     
     return farms
 
+@app.get("/farms/overview", response_model=FarmsOverview)
+async def get_farms_overview(
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get farms, crops, latest weather and pending recommendation counts in one response"""
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(Farm.farmer_id == current_farmer.id)
+    )
+    farms = result.scalars().all()
+    farm_ids = [farm.id for farm in farms]
+    
+    latest_weather = {}
+    pending_counts = {}
+    if farm_ids:
+        # Latest stored weather reading per farm
+        latest_ids = (
+            select(func.max(WeatherData.id).label("id"))
+            .filter(WeatherData.farm_id.in_(farm_ids))
+            .group_by(WeatherData.farm_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(WeatherData).join(latest_ids, WeatherData.id == latest_ids.c.id)
+        )
+        latest_weather = {weather.farm_id: weather for weather in result.scalars().all()}
+        
+        # Pending recommendations per farm
+        result = await db.execute(
+            select(Recommendation.farm_id, func.count(Recommendation.id))
+            .filter(
+                Recommendation.farm_id.in_(farm_ids),
+                Recommendation.status == "pending"
+            )
+            .group_by(Recommendation.farm_id)
+        )
+        pending_counts = dict(result.all())
+    
+    farm_overviews = [
+        FarmOverview(
+            **FarmSchema.model_validate(farm).model_dump(),
+            latest_weather=latest_weather.get(farm.id),
+            pending_recommendations=pending_counts.get(farm.id, 0)
+        )
+        for farm in farms
+    ]
+    
+    return FarmsOverview(
+        total_farms=len(farms),
+        total_crops=sum(len(farm.crops) for farm in farms),
+        pending_recommendations=sum(pending_counts.values()),
+        farms=farm_overviews
+    )
+
+@app.get("/farms/irrigation", response_model=List[CropIrrigationPlan])
+async def get_all_irrigation_plans(
+    days: int = Query(0, ge=0, le=MAX_FORECAST_DAYS),
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get irrigation plans for every crop on all of the current farmer's farms"""
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(Farm.farmer_id == current_farmer.id)
+    )
+    farms = result.scalars().all()
+    
+    return await build_irrigation_plans(farms, days)
+
+@app.get("/farms/fertilizer", response_model=List[CropFertilizerRecommendation])
+async def get_all_fertilizer_recommendations(
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get fertilizer recommendations for every crop on all of the current farmer's farms"""
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(Farm.farmer_id == current_farmer.id)
+    )
+    farms = result.scalars().all()
+    
+    return build_fertilizer_recommendations(farms)
+
 @app.get("/farms/{farm_id}", response_model=FarmSchema)
 async def get_farm(
     farm_id: int,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get specific farm details"""
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -293,13 +382,16 @@ async def update_farm(
     farm_id: int,
     farm_update: FarmCreate,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a farm"""
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -314,8 +406,8 @@ async def update_farm(
     farm.latitude = farm_update.latitude
     farm.longitude = farm_update.longitude
     
-    db.commit()
-    db.refresh(farm)
+    await db.commit()
+    await db.refresh(farm)
     
     return farm
 
@@ -323,15 +415,19 @@ async def update_farm(
 @app.post("/crops", response_model=CropSchema)
 async def create_crop(
     crop: CropCreate,
+    background_tasks: BackgroundTasks,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new crop"""
     # Verify farm belongs to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == crop.farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == crop.farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -349,8 +445,11 @@ async def create_crop(
     )
     
     db.add(db_crop)
-    db.commit()
-    db.refresh(db_crop)
+    await db.commit()
+    await db.refresh(db_crop)
+    
+    # Give the new crop its recommendations without waiting for the next scheduled run
+    background_tasks.add_task(recommendation_scheduler.run_once, [crop.farm_id])
     
     return db_crop
 
@@ -358,14 +457,17 @@ async def create_crop(
 async def get_farm_crops(
     farm_id: int,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all crops for a specific farm"""
     # Verify farm belongs to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -373,7 +475,10 @@ async def get_farm_crops(
             detail="Farm not found"
         )
     
-    crops = db.query(Crop).filter(Crop.farm_id == farm_id).all()
+    result = await db.execute(
+        select(Crop).filter(Crop.farm_id == farm_id)
+    )
+    crops = result.scalars().all()
     return crops
 
 # Weather endpoints
@@ -381,14 +486,17 @@ async def get_farm_crops(
 async def get_farm_weather(
     farm_id: int,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current weather data for a farm"""
     # Verify farm belongs to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -397,19 +505,20 @@ async def get_farm_weather(
         )
     
     # Get weather data
-    weather_data = weather_service.get_current_weather(farm.latitude, farm.longitude)
+    weather_data = (await weather_service.get_current_weather_many([(farm.latitude, farm.longitude)]))[0]
     
-    # Store weather data in database
-    if weather_data:
-        db_weather = WeatherData(
+    # Store weather data in database, written in bulk by the telemetry writer;
+    # stale and fallback readings are not new observations
+    if weather_data and not weather_data.get("freshness", {}).get("stale"):
+        telemetry_writer.add(
+            WeatherData,
             farm_id=farm_id,
             temperature=weather_data["temperature"],
             humidity=weather_data["humidity"],
             rainfall=weather_data["rainfall"],
-            wind_speed=weather_data["wind_speed"]
+            wind_speed=weather_data["wind_speed"],
+            recorded_at=datetime.now()
         )
-        db.add(db_weather)
-        db.commit()
     
     return weather_data
 
@@ -418,14 +527,17 @@ async def get_farm_weather_forecast(
     farm_id: int,
     days: int = 5,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get weather forecast for a farm"""
     # Verify farm belongs to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -433,7 +545,7 @@ async def get_farm_weather_forecast(
             detail="Farm not found"
         )
     
-    forecast_data = weather_service.get_weather_forecast(farm.latitude, farm.longitude, days)
+    forecast_data = (await weather_service.get_weather_forecast_many([(farm.latitude, farm.longitude)], days))[0]
     return forecast_data
 
 # Recommendation endpoints
@@ -442,14 +554,17 @@ async def get_irrigation_recommendation(
     farm_id: int,
     crop_id: int,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get irrigation recommendation for a crop"""
     # Verify farm and crop belong to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -457,10 +572,13 @@ async def get_irrigation_recommendation(
             detail="Farm not found"
         )
     
-    crop = db.query(Crop).filter(
-        Crop.id == crop_id,
-        Crop.farm_id == farm_id
-    ).first()
+    result = await db.execute(
+        select(Crop).filter(
+            Crop.id == crop_id,
+            Crop.farm_id == farm_id
+        )
+    )
+    crop = result.scalars().first()
     
     if not crop:
         raise HTTPException(
@@ -469,7 +587,7 @@ async def get_irrigation_recommendation(
         )
     
     # Get current weather data
-    weather_data = weather_service.get_current_weather(farm.latitude, farm.longitude)
+    weather_data = (await weather_service.get_current_weather_many([(farm.latitude, farm.longitude)]))[0]
     
     # Prepare data for ML model
     crop_data = {
@@ -486,19 +604,46 @@ async def get_irrigation_recommendation(
     
     return IrrigationRecommendation(**recommendation)
 
+@app.get("/farms/{farm_id}/irrigation", response_model=List[CropIrrigationPlan])
+async def get_farm_irrigation_plans(
+    farm_id: int,
+    days: int = Query(0, ge=0, le=MAX_FORECAST_DAYS),
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get irrigation plans for every crop on a farm"""
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
+    
+    if not farm:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Farm not found"
+        )
+    
+    return await build_irrigation_plans([farm], days)
+
 @app.get("/farms/{farm_id}/crops/{crop_id}/fertilizer", response_model=FertilizerRecommendation)
 async def get_fertilizer_recommendation(
     farm_id: int,
     crop_id: int,
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get fertilizer recommendation for a crop"""
     # Verify farm and crop belong to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -506,10 +651,13 @@ async def get_fertilizer_recommendation(
             detail="Farm not found"
         )
     
-    crop = db.query(Crop).filter(
-        Crop.id == crop_id,
-        Crop.farm_id == farm_id
-    ).first()
+    result = await db.execute(
+        select(Crop).filter(
+            Crop.id == crop_id,
+            Crop.farm_id == farm_id
+        )
+    )
+    crop = result.scalars().first()
     
     if not crop:
         raise HTTPException(
@@ -529,20 +677,58 @@ async def get_fertilizer_recommendation(
     
     return FertilizerRecommendation(**recommendation)
 
+@app.get("/farms/{farm_id}/fertilizer", response_model=List[CropFertilizerRecommendation])
+async def get_farm_fertilizer_recommendations(
+    farm_id: int,
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get fertilizer recommendations for every crop on a farm"""
+    result = await db.execute(
+        select(Farm).options(selectinload(Farm.crops)).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
+    
+    if not farm:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Farm not found"
+        )
+    
+    return build_fertilizer_recommendations([farm])
+
+@app.post("/fertilizer/batch", response_model=List[FertilizerRecommendation])
+async def get_batch_fertilizer_recommendations(
+    soil_samples: List[SoilSample],
+    current_farmer: Farmer = Depends(get_current_farmer)
+):
+    """Get fertilizer recommendations for many soil samples in one request"""
+    recommendations = ml_manager.predict_fertilizer_recommendations(
+        [sample.model_dump(exclude_none=True) for sample in soil_samples]
+    )
+    return [FertilizerRecommendation(**recommendation) for recommendation in recommendations]
+
 @app.post("/farms/{farm_id}/crops/{crop_id}/disease-detection", response_model=PestDetectionResult)
 async def detect_disease(
     farm_id: int,
     crop_id: int,
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(...),
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Upload image for disease detection"""
     # Verify farm and crop belong to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -550,10 +736,13 @@ async def detect_disease(
             detail="Farm not found"
         )
     
-    crop = db.query(Crop).filter(
-        Crop.id == crop_id,
-        Crop.farm_id == farm_id
-    ).first()
+    result = await db.execute(
+        select(Crop).filter(
+            Crop.id == crop_id,
+            Crop.farm_id == farm_id
+        )
+    )
+    crop = result.scalars().first()
     
     if not crop:
         raise HTTPException(
@@ -561,42 +750,60 @@ async def detect_disease(
             detail="Crop not found"
         )
     
-    # Save uploaded image
-    file_extension = image.filename.split(".")[-1] if "." in image.filename else "jpg"
-    filename = f"disease_{farm_id}_{crop_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_extension}"
-    file_path = os.path.join("uploads", filename)
+    # Read the upload into memory and persist the original after responding
+    image_bytes, content_hash = await read_upload(image)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(image.file, buffer)
+    # The extension comes from the client; keep it short enough for the image_path column
+    file_extension = os.path.splitext(image.filename or "")[1].lstrip(".").lower()
+    if not (file_extension.isascii() and file_extension.isalnum()) or len(file_extension) > 10:
+        file_extension = "jpg"
+    filename = f"disease_{farm_id}_{crop_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{content_hash[:8]}.{file_extension}"
+    file_path = os.path.join("uploads", filename)
+    background_tasks.add_task(save_upload, file_path, image_bytes)
     
     # Predict disease
-    prediction = ml_manager.predict_disease(file_path)
+    prediction = await ml_manager.predict_disease_bytes_async(image_bytes, content_hash)
     
-    # Store detection result in database
-    db_detection = DiseaseDetection(
+    # Store detection result in database, written in bulk by the telemetry writer
+    telemetry_writer.add(
+        DiseaseDetection,
         farm_id=farm_id,
         crop_id=crop_id,
         image_path=file_path,
         predicted_disease=prediction["disease_name"],
-        confidence_score=prediction["confidence"]
+        confidence_score=prediction["confidence"],
+        detection_date=datetime.now()
     )
-    db.add(db_detection)
-    db.commit()
     
     return PestDetectionResult(**prediction)
 
 @app.get("/farms/{farm_id}/recommendations", response_model=List[RecommendationSchema])
 async def get_farm_recommendations(
     farm_id: int,
+    response: Response,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    recommendation_type: Optional[str] = None,
+    priority: Optional[str] = None,
+    crop_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all recommendations for a farm"""
+    """
+    Get recommendations for a farm, newest first. Pass the X-Next-Cursor
+    response header back as cursor to get the next page.
+    """
     # Verify farm belongs to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -604,25 +811,53 @@ async def get_farm_recommendations(
             detail="Farm not found"
         )
     
-    # Generate automatic recommendations if none exist
-    await generate_automatic_recommendations(farm_id, db)
+    query = select(Recommendation).filter(Recommendation.farm_id == farm_id)
+    if status_filter:
+        query = query.filter(Recommendation.status == status_filter)
+    if recommendation_type:
+        query = query.filter(Recommendation.recommendation_type == recommendation_type)
+    if priority:
+        query = query.filter(Recommendation.priority == priority)
+    if crop_id is not None:
+        query = query.filter(Recommendation.crop_id == crop_id)
+    if since:
+        query = query.filter(Recommendation.created_at >= since)
+    if until:
+        query = query.filter(Recommendation.created_at < until)
     
-    recommendations = db.query(Recommendation).filter(Recommendation.farm_id == farm_id).all()
+    recommendations, next_cursor = await fetch_page(
+        db, query, Recommendation.created_at, Recommendation.id, cursor, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return recommendations
 
 
 @app.get("/farms/{farm_id}/disease-history")
 async def get_disease_history(
     farm_id: int,
+    response: Response,
+    crop_id: Optional[int] = None,
+    predicted_disease: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_farmer: Farmer = Depends(get_current_farmer),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get disease detection history for a farm"""
+    """
+    Get disease detection history for a farm, newest first. Pass the
+    X-Next-Cursor response header back as cursor to get the next page.
+    """
     # Verify farm belongs to farmer
-    farm = db.query(Farm).filter(
-        Farm.id == farm_id,
-        Farm.farmer_id == current_farmer.id
-    ).first()
+    result = await db.execute(
+        select(Farm).filter(
+            Farm.id == farm_id,
+            Farm.farmer_id == current_farmer.id
+        )
+    )
+    farm = result.scalars().first()
     
     if not farm:
         raise HTTPException(
@@ -630,9 +865,67 @@ async def get_disease_history(
             detail="Farm not found"
         )
     
-    detections = db.query(DiseaseDetection).filter(DiseaseDetection.farm_id == farm_id).all()
+    query = select(DiseaseDetection).filter(DiseaseDetection.farm_id == farm_id)
+    if crop_id is not None:
+        query = query.filter(DiseaseDetection.crop_id == crop_id)
+    if predicted_disease:
+        query = query.filter(DiseaseDetection.predicted_disease == predicted_disease)
+    if since:
+        query = query.filter(DiseaseDetection.detection_date >= since)
+    if until:
+        query = query.filter(DiseaseDetection.detection_date < until)
+    
+    detections, next_cursor = await fetch_page(
+        db, query, DiseaseDetection.detection_date, DiseaseDetection.id, cursor, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return detections
 
+@app.get("/export/{dataset}")
+async def export_farm_history(
+    dataset: str,
+    farm_id: Optional[List[int]] = Query(None),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    export_format: str = Query("ndjson", alias="format"),
+    current_farmer: Farmer = Depends(get_current_farmer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream recommendations, weather or disease_detections rows for the given
+    farms (default: all of the farmer's farms) as NDJSON or CSV
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dataset, expected one of: {', '.join(EXPORT_DATASETS)}"
+        )
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown format, expected one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    
+    # Verify farms belong to farmer
+    query = select(Farm.id).filter(Farm.farmer_id == current_farmer.id)
+    if farm_id:
+        query = query.filter(Farm.id.in_(farm_id))
+    result = await db.execute(query)
+    farm_ids = result.scalars().all()
+    
+    if farm_id and len(farm_ids) != len(set(farm_id)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Farm not found"
+        )
+    
+    return StreamingResponse(
+        export_lines(dataset, farm_ids, export_format, since, until),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{export_format}"'}
+    )
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -643,6 +936,118 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness of the worker process that answered, with the models it serves"""
+    return {
+        "status": "ready",
+        "worker": int(os.getenv("SERVER_WORKER", "0")),
+        **ml_manager.get_readiness()
+    }
+
+@app.get("/ml/inference-stats")
+async def get_inference_stats():
+    """Get disease detection inference queue and prediction cache statistics"""
+    return {
+        **ml_manager.disease_queue.get_stats(),
+        "prediction_cache": ml_manager.prediction_cache.get_stats(),
+        "process_pool": ml_manager.inference_pool.get_stats() if ml_manager.inference_pool else None
+    }
+
+@app.get("/ml/models")
+async def get_model_versions():
+    """Get the active version, checksum and load/warm-up timings of each model"""
+    return ml_manager.get_model_versions()
+
+@app.post("/ml/models/reload", dependencies=[Depends(require_admin_token)])
+async def reload_models():
+    """Load, warm up and swap in any model whose file changed on disk"""
+    results = await asyncio.to_thread(ml_manager.reload_models)
+    return {"results": results, "models": ml_manager.get_model_versions()}
+
+@app.get("/auth/cache-stats")
+async def get_principal_cache_stats():
+    """Get authenticated farmer cache statistics"""
+    return principal_cache.get_stats()
+
+@app.get("/db/write-behind-stats")
+async def get_write_behind_stats():
+    """Get telemetry write-behind queue depth and flush latency"""
+    return telemetry_writer.get_stats()
+
+@app.get("/weather/cache-stats")
+async def get_weather_cache_stats():
+    """Get weather cache statistics"""
+    return weather_service.cache.get_stats()
+
+@app.get("/weather/upstream-stats")
+async def get_weather_upstream_stats():
+    """Get weather latency budget, hedging and circuit breaker statistics"""
+    return weather_service.get_stats()
+
+def collect_service_metrics():
+    """Expose the existing model, cache and queue statistics as Prometheus metrics at scrape time"""
+    versions = ml_manager.get_model_versions()
+    for stat in ("load_seconds", "warmup_seconds"):
+        yield (
+            f"model_{stat}", "gauge", f"{stat.replace('_', ' ').capitalize()} of the active model version",
+            [({"model": name, "version": info.get("version", "")}, info[stat]) for name, info in versions.items() if stat in info]
+        )
+    
+    caches = {
+        "weather": weather_service.cache.get_stats(),
+        "principal": principal_cache.get_stats(),
+        "disease_prediction": ml_manager.prediction_cache.get_stats(),
+    }
+    for stat in ("hits", "misses"):
+        yield (
+            f"cache_{stat}_total", "counter", f"Cache {stat} by cache",
+            [({"cache": name}, stats[stat]) for name, stats in caches.items()]
+        )
+    yield ("cache_hit_ratio", "gauge", "Cache hit ratio by cache", [({"cache": name}, stats["hit_ratio"]) for name, stats in caches.items()])
+    yield ("cache_entries", "gauge", "Cache entries by cache", [({"cache": name}, stats["entries"]) for name, stats in caches.items()])
+    
+    weather_stats = weather_service.get_stats()
+    breaker_state = weather_stats["circuit_breaker"]["state"]
+    yield (
+        "weather_circuit_breaker_state", "gauge", "Weather circuit breaker state (1 for the current state)",
+        [({"state": state}, int(state == breaker_state)) for state in ("closed", "half_open", "open")]
+    )
+    yield ("weather_circuit_breaker_trips_total", "counter", "Times the weather circuit breaker opened",
+           [({}, weather_stats["circuit_breaker"]["trips"])])
+    yield ("weather_budget_exceeded_total", "counter", "Weather lookups that gave up waiting on upstream",
+           [({}, weather_stats["budget_exceeded"])])
+    yield ("weather_hedged_requests_total", "counter", "Hedged second requests sent to the weather API",
+           [({}, weather_stats["hedges"])])
+    
+    queue_stats = ml_manager.disease_queue.get_stats()
+    yield ("inference_queue_depth", "gauge", "Disease inference requests waiting to be batched", [({}, queue_stats["queue_depth"])])
+    yield ("inference_requests_total", "counter", "Disease inference requests served", [({}, queue_stats["total_requests"])])
+    yield ("inference_batches_total", "counter", "Disease inference batches run", [({}, queue_stats["total_batches"])])
+    
+    writer_stats = telemetry_writer.get_stats()
+    yield ("write_behind_pending_rows", "gauge", "Telemetry rows waiting to be flushed", [({}, writer_stats["pending_rows"])])
+    yield ("write_behind_rows_written_total", "counter", "Telemetry rows written", [({}, writer_stats["rows_written"])])
+    yield ("write_behind_dropped_rows_total", "counter", "Telemetry rows dropped", [({}, writer_stats["dropped_rows"])])
+    yield ("write_behind_failed_flushes_total", "counter", "Telemetry flushes that failed", [({}, writer_stats["failed_flushes"])])
+
+REGISTRY.register_collector(collect_service_metrics)
+
+@app.get("/profiles", dependencies=[Depends(require_profiling_token)])
+async def get_profiles():
+    """List saved request profiles, newest first"""
+    return {"profiles": list_profiles()}
+
+@app.get("/profiles/{name}", dependencies=[Depends(require_profiling_token)])
+async def download_profile(name: str):
+    """Download a saved request profile"""
+    return FileResponse(profile_path(name), filename=name)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,43 +1,474 @@
 import pickle
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
 from PIL import Image
 import json
+import io
 import os
-from typing import Dict, List, Tuple
+import asyncio
+import copy
+import hashlib
+import threading
+import queue
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 import pandas as pd
 
+from disease_backends import DISEASE_MODEL_FILES, load_disease_model, prepare_disease_image
+from fertilizer_forest import FERTILIZER_MODEL_FILES, CompiledForest, load_forest
+from inference_pool import InferenceProcessPool, in_inference_worker
+from metrics import IMAGE_PREPROCESS_SECONDS, MODEL_INFERENCE_SECONDS
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_RELOAD_INTERVAL_SECONDS = float(os.getenv("MODEL_RELOAD_INTERVAL_SECONDS", "0"))
+
+# keras, tflite or onnx; see convert_disease_model.py for producing the latter two
+DISEASE_MODEL_BACKEND = os.getenv("DISEASE_MODEL_BACKEND", "keras").lower()
+# sklearn (pickled forest) or compiled; see compile_fertilizer_model.py for producing the latter
+FERTILIZER_MODEL_BACKEND = os.getenv("FERTILIZER_MODEL_BACKEND", "sklearn").lower()
+# Serve the estimator inside a {"model", "columns"} pickle bundle, feeding it its trained
+# columns. Off by default: such bundles are served by the rule-based recommendations
+FERTILIZER_USE_TRAINED_MODEL = os.getenv("FERTILIZER_USE_TRAINED_MODEL", "false").lower() == "true"
+DISEASE_INFERENCE_THREADS = int(os.getenv("DISEASE_INFERENCE_THREADS", "0")) or None
+# Number of dedicated inference worker processes; 0 runs the disease model in the API process
+DISEASE_INFERENCE_PROCESSES = int(os.getenv("DISEASE_INFERENCE_PROCESSES", "0"))
+DISEASE_INFERENCE_PIN_CPUS = os.getenv("DISEASE_INFERENCE_PIN_CPUS", "false").lower() == "true"
+
+# Set by run_server.py in the parent of a multi-worker server. The parent then loads only models
+# that can be shared with the forked workers; the rest is loaded by each worker in after_fork()
+MODEL_PRELOAD_FOR_FORK = os.getenv("MODEL_PRELOAD_FOR_FORK", "false").lower() == "true"
+# TensorFlow, ONNX Runtime and TFLite start native thread pools on load, which do not survive fork()
+FORK_UNSAFE_MODELS = ("disease_model",)
+
+# Attribute name on MLModelManager -> file in MODEL_DIR
+MODEL_FILES = {
+    # The compiled forest is the trained estimator, so it is only served when that is enabled
+    "fertilizer_model": FERTILIZER_MODEL_FILES.get(
+        FERTILIZER_MODEL_BACKEND if FERTILIZER_USE_TRAINED_MODEL else "sklearn", FERTILIZER_MODEL_FILES["sklearn"]
+    ),
+    "disease_model": DISEASE_MODEL_FILES.get(DISEASE_MODEL_BACKEND, DISEASE_MODEL_FILES["keras"]),
+    "disease_class_names": "disease_class_names.json"
+}
+
+DISEASE_BATCH_MAX_SIZE = int(os.getenv("DISEASE_BATCH_MAX_SIZE", "16"))
+DISEASE_BATCH_MAX_WAIT_MS = float(os.getenv("DISEASE_BATCH_MAX_WAIT_MS", "10"))
+DISEASE_PREDICTION_CACHE_SIZE = int(os.getenv("DISEASE_PREDICTION_CACHE_SIZE", "1024"))
+DISEASE_PREDICTION_CACHE_PATH = os.getenv("DISEASE_PREDICTION_CACHE_PATH", "")
+
+# Fertilizer model input features and their defaults, in model column order
+FERTILIZER_FEATURES = [
+    ('soil_ph', 6.5),
+    ('organic_matter', 2.0),
+    ('nitrogen', 50.0),
+    ('phosphorus', 30.0),
+    ('potassium', 100.0),
+    ('area_acres', 1.0)
+]
+
+# With FERTILIZER_USE_TRAINED_MODEL, models trained with named columns (temperature, humidity,
+# moisture, N/K/P and one-hot soil and crop types) get their inputs by column name instead of
+# FERTILIZER_FEATURES; columns the soil samples do not carry fall back to these defaults
+FERTILIZER_COLUMN_DEFAULTS = {**dict(FERTILIZER_FEATURES), 'temperature': 30.0, 'humidity': 60.0, 'moisture': 40.0}
+FERTILIZER_COLUMN_ALIASES = {'temparature': 'temperature', 'phosphorous': 'phosphorus'}
+FERTILIZER_ONE_HOT_PREFIXES = {'soil type_': 'soil_type', 'crop type_': 'crop_type'}
+
+IRRIGATION_STAGE_MULTIPLIERS = {
+    'seedling': 0.5,
+    'vegetative': 1.0,
+    'flowering': 1.3,
+    'fruiting': 1.5,
+    'harvesting': 0.8
+}
+
+IRRIGATION_SOIL_MULTIPLIERS = {
+    'sandy': 1.3,
+    'loamy': 1.0,
+    'clay': 0.8
+}
+
+def _lookup_multipliers(values, multipliers: Dict[str, float], default: float = 1.0) -> np.ndarray:
+    """Map an array of category names to multipliers, defaulting unknown names"""
+    values = np.asarray(values, dtype=object)
+    unique, inverse = np.unique(values, return_inverse=True)
+    table = np.array([multipliers.get(value, default) for value in unique], dtype=float)
+    return table[inverse].reshape(values.shape)
+
+def irrigation_reason(temperature, humidity, rainfall, crop_stage) -> str:
+    return f"Based on temperature: {temperature}°C, humidity: {humidity}%, rainfall: {rainfall}mm, crop stage: {crop_stage}"
+
+class InferenceQueue:
+    """
+    Micro-batching queue for model inference.
+
+    Requests submitted from any thread are collected by ``workers`` worker
+    threads into batches of up to ``max_batch_size`` items, waiting at most
+    ``max_wait_ms`` after the first item arrives. Each batch goes through one
+    ``predict_batch`` call and every caller gets its own row back through a
+    ``concurrent.futures.Future``.
+    """
+    
+    def __init__(self, predict_batch: Callable[[np.ndarray], np.ndarray],
+                 max_batch_size: int = DISEASE_BATCH_MAX_SIZE,
+                 max_wait_ms: float = DISEASE_BATCH_MAX_WAIT_MS,
+                 workers: int = 1, name: str = "disease_model"):
+        self.predict_batch = predict_batch
+        self.name = name
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self.workers = max(1, workers)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        
+        # Statistics
+        self._stats_lock = threading.Lock()
+        self.total_requests = 0
+        self.total_batches = 0
+        self.max_observed_batch = 0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self.total_inference_seconds = 0.0
+    
+    def submit(self, item: np.ndarray) -> Future:
+        """Queue a single preprocessed input and return a future for its prediction"""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+    
+    def _ensure_worker(self):
+        if len(self._threads) == self.workers and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._run, name=f"inference-queue-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+    
+    def _collect_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Drop requests whose callers have already gone away
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            
+            started = time.perf_counter()
+            try:
+                predictions = self.predict_batch(np.stack([item for item, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            finally:
+                self._record_batch(len(batch), time.perf_counter() - started)
+            
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+    
+    def _record_batch(self, size: int, seconds: float):
+        MODEL_INFERENCE_SECONDS.observe(seconds, self.name)
+        with self._stats_lock:
+            self.total_requests += size
+            self.total_batches += 1
+            self.max_observed_batch = max(self.max_observed_batch, size)
+            self.batch_size_histogram[size] = self.batch_size_histogram.get(size, 0) + 1
+            self.total_inference_seconds += seconds
+    
+    def get_stats(self) -> Dict:
+        """Return queue depth and batch-size statistics"""
+        with self._stats_lock:
+            batches = self.total_batches
+            return {
+                "queue_depth": self._queue.qsize(),
+                "workers": self.workers,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "total_requests": self.total_requests,
+                "total_batches": batches,
+                "average_batch_size": round(self.total_requests / batches, 2) if batches else 0.0,
+                "max_observed_batch_size": self.max_observed_batch,
+                "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+                "average_batch_latency_ms": round(self.total_inference_seconds / batches * 1000.0, 2) if batches else 0.0,
+            }
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction results keyed by image content hash and
+    model version, optionally persisted to a JSON file across restarts.
+    """
+    
+    def __init__(self, max_entries: int = DISEASE_PREDICTION_CACHE_SIZE, path: str = DISEASE_PREDICTION_CACHE_PATH):
+        self.max_entries = max(1, max_entries)
+        self.path = path
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+    
+    def put(self, key: str, value: Dict):
+        with self._lock:
+            self._entries[key] = copy.deepcopy(value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def load(self):
+        """Restore entries saved by a previous process, if persistence is enabled"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+            with self._lock:
+                for key, value in entries[-self.max_entries:]:
+                    self._entries[key] = value
+            print(f"Loaded {len(self._entries)} cached disease predictions")
+        except (OSError, ValueError) as e:
+            print(f"Error loading prediction cache: {e}")
+    
+    def save(self):
+        """Write the entries to disk, least recently used first"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp_path = None
+        try:
+            # Unique per writer: the workers of a multi-worker server all save on shutdown
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self.path)),
+                prefix=f"{os.path.basename(self.path)}.", suffix=".tmp"
+            )
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving prediction cache: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "persistent": bool(self.path),
+            }
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class MLModelManager:
     def __init__(self):
         self.fertilizer_model = None
         self.disease_model = None
         self.disease_class_names = None
+        self.model_versions: Dict[str, Dict] = {}
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self.inference_pool = None
+        if DISEASE_INFERENCE_PROCESSES > 0 and not MODEL_PRELOAD_FOR_FORK:
+            self._start_inference_pool()
+        # One dispatcher thread per inference process keeps every process busy
+        self.disease_queue = InferenceQueue(self._predict_disease_batch, workers=max(1, DISEASE_INFERENCE_PROCESSES))
+        self.prediction_cache = PredictionCache()
         self.load_models()
     
+    def _start_inference_pool(self):
+        self.inference_pool = InferenceProcessPool(
+            DISEASE_INFERENCE_PROCESSES,
+            threads_per_process=DISEASE_INFERENCE_THREADS,
+            max_batch_size=DISEASE_BATCH_MAX_SIZE,
+            pin_cpus=DISEASE_INFERENCE_PIN_CPUS
+        )
+    
     def load_models(self):
         """Load all ML models and class names"""
-        try:
-            # Load fertilizer recommendation model
-            if os.path.exists("models/fertilizer_model.pkl"):
-                with open("models/fertilizer_model.pkl", "rb") as f:
-                    self.fertilizer_model = pickle.load(f)
-                print("Fertilizer model loaded successfully")
-            
-            # Load plant disease detection model
-            if os.path.exists("models/plant_disease_model.h5"):
-                self.disease_model = load_model("models/plant_disease_model.h5")
-                print("Disease detection model loaded successfully")
-            
-            # Load disease class names
-            if os.path.exists("models/disease_class_names.json"):
-                with open("models/disease_class_names.json", "r") as f:
-                    self.disease_class_names = json.load(f)
-                print("Disease class names loaded successfully")
+        if in_inference_worker():
+            # Spawned inference workers import the API modules again; they load their own disease model only
+            return
+        if MODEL_PRELOAD_FOR_FORK:
+            self.reload_models(force=True, names=[name for name in MODEL_FILES if name not in FORK_UNSAFE_MODELS])
+        else:
+            self.reload_models(force=True)
+    
+    def after_fork(self):
+        """
+        Finish loading in a worker forked from a MODEL_PRELOAD_FOR_FORK parent:
+        start this worker's inference pool and load the models the parent skipped.
+        Models the parent loaded stay shared copy-on-write until they are reloaded.
+        """
+        if not MODEL_PRELOAD_FOR_FORK:
+            return
+        if DISEASE_INFERENCE_PROCESSES > 0 and self.inference_pool is None:
+            self._start_inference_pool()
+        self.reload_models(force=True, names=FORK_UNSAFE_MODELS)
+    
+    def _load_model_file(self, name: str, path: str):
+        if name == "fertilizer_model":
+            if path.endswith(".forest"):
+                return load_forest(path)
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+            # Trained models are saved as {"model": estimator, "columns": feature names}
+            if FERTILIZER_USE_TRAINED_MODEL and isinstance(model, dict) and "model" in model:
+                model = model["model"]
+            return model
+        if name == "disease_model":
+            if self.inference_pool is not None:
+                # The worker processes load and warm up the model, the API process only holds the pool
+                return self.inference_pool.load(path)
+            return load_disease_model(path, num_threads=DISEASE_INFERENCE_THREADS)
+        with open(path, "r") as f:
+            class_names = json.load(f)
+        # Accept a plain list of class names as well as an index -> name mapping
+        if isinstance(class_names, list):
+            class_names = {str(i): class_name for i, class_name in enumerate(class_names)}
+        return class_names
+    
+    def _warm_up_model(self, name: str, model):
+        """Run one inference on synthetic input so the first real request is not cold"""
+        if name == "disease_model":
+            model.predict(np.zeros((1, 224, 224, 3), dtype="float32"), verbose=0)
+        elif name == "fertilizer_model" and hasattr(model, "predict") and not isinstance(model, dict):
+            model.predict(self._fertilizer_model_input(model, [{}]))
+    
+    def reload_models(self, force: bool = False, names: Optional[Sequence[str]] = None) -> Dict[str, str]:
+        """
+        Load every model file whose checksum differs from the active version,
+        warm it up and then swap it in. Files whose modification time and
+        size are unchanged are not re-hashed. The swap is a single attribute
+        assignment, so in-flight predictions finish on the version they
+        started with. ``names`` limits the reload to some of MODEL_FILES.
+        """
+        results = {}
+        with self._reload_lock:
+            for name, filename in MODEL_FILES.items():
+                if names is not None and name not in names:
+                    continue
+                path = os.path.join(MODEL_DIR, filename)
+                if not os.path.exists(path):
+                    results[name] = "missing"
+                    continue
                 
-        except Exception as e:
-            print(f"Error loading models: {e}")
+                try:
+                    stat = os.stat(path)
+                    active = self.model_versions.get(name)
+                    # Hashing a large .h5 file on every watcher tick is wasteful; only
+                    # hash when the modification time or size moved
+                    if (not force and active is not None
+                            and (active.get("mtime_ns"), active.get("size")) == (stat.st_mtime_ns, stat.st_size)):
+                        results[name] = "unchanged"
+                        continue
+                    checksum = file_checksum(path)
+                    if not force and active is not None and active["checksum"] == checksum:
+                        active["mtime_ns"], active["size"] = stat.st_mtime_ns, stat.st_size
+                        results[name] = "unchanged"
+                        continue
+                    
+                    started = time.perf_counter()
+                    model = self._load_model_file(name, path)
+                    load_seconds = time.perf_counter() - started
+                    
+                    started = time.perf_counter()
+                    self._warm_up_model(name, model)
+                    warmup_seconds = time.perf_counter() - started
+                    
+                    setattr(self, name, model)
+                    self.model_versions[name] = {
+                        "version": checksum[:12],
+                        "checksum": checksum,
+                        "path": path,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "type": type(model).__name__,
+                        "loaded_at": datetime.now().isoformat(),
+                        "load_seconds": round(load_seconds, 4),
+                        "warmup_seconds": round(warmup_seconds, 4),
+                        "pid": os.getpid(),
+                    }
+                    results[name] = "loaded"
+                    print(f"{name} version {checksum[:12]} loaded successfully ({type(model).__name__}, load {load_seconds:.2f}s, warm-up {warmup_seconds:.2f}s)")
+                    
+                except Exception as e:
+                    results[name] = f"error: {e}"
+                    print(f"Error loading {name}: {e}")
+        
+        return results
+    
+    def get_model_versions(self) -> Dict[str, Dict]:
+        """Return the active version, checksum and load timings of each model"""
+        return {name: dict(version) for name, version in self.model_versions.items()}
+    
+    def get_readiness(self) -> Dict:
+        """Which models this process serves, and whether each was loaded here or inherited from a pre-fork parent"""
+        pid = os.getpid()
+        models = {}
+        for name in MODEL_FILES:
+            version = self.model_versions.get(name)
+            models[name] = {
+                "version": version["version"],
+                "shared_from_parent": version.get("pid", pid) != pid,
+            } if version else None
+        return {"pid": pid, "models": models}
+    
+    def shutdown(self):
+        """Persist the prediction cache and stop the inference worker processes"""
+        self.prediction_cache.save()
+        if self.inference_pool is not None:
+            self.inference_pool.close()
+    
+    def start_model_watcher(self, interval_seconds: float = MODEL_RELOAD_INTERVAL_SECONDS):
+        """Poll the model files in a background thread and hot reload changed ones"""
+        if interval_seconds <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        
+        def watch():
+            while True:
+                time.sleep(interval_seconds)
+                self.reload_models()
+        
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
     
     def predict_fertilizer_recommendation(self, soil_data: Dict) -> Dict:
         """
@@ -53,144 +484,175 @@ class MLModelManager:
             'area_acres': float
         }
         """
+        return self.predict_fertilizer_recommendations([soil_data])[0]
+    
+    def _fertilizer_feature_matrix(self, soil_samples: List[Dict], columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Build one (samples x features) matrix for the fertilizer model, in FERTILIZER_FEATURES or the given column order"""
+        if columns is None:
+            return np.array(
+                [[sample.get(name, default) for name, default in FERTILIZER_FEATURES] for sample in soil_samples],
+                dtype=float
+            )
+        
+        matrix = np.empty((len(soil_samples), len(columns)), dtype=float)
+        for j, column in enumerate(columns):
+            key = column.strip().lower()
+            prefix = next((prefix for prefix in FERTILIZER_ONE_HOT_PREFIXES if key.startswith(prefix)), None)
+            if prefix:
+                field, category = FERTILIZER_ONE_HOT_PREFIXES[prefix], key[len(prefix):]
+                matrix[:, j] = [str(sample.get(field) or "").strip().lower() == category for sample in soil_samples]
+            else:
+                key = FERTILIZER_COLUMN_ALIASES.get(key, key)
+                matrix[:, j] = [sample.get(key, FERTILIZER_COLUMN_DEFAULTS.get(key, 0.0)) for sample in soil_samples]
+        return matrix
+    
+    def _fertilizer_model_input(self, model, soil_samples: List[Dict]):
+        """Model input for soil samples; sklearn models fitted on named columns get a DataFrame"""
+        columns = getattr(model, "feature_names_in_", None) if FERTILIZER_USE_TRAINED_MODEL else None
+        matrix = self._fertilizer_feature_matrix(soil_samples, None if columns is None else list(columns))
+        if columns is not None and not isinstance(model, CompiledForest):
+            return pd.DataFrame(matrix, columns=columns)
+        return matrix
+    
+    def predict_fertilizer_recommendations(self, soil_samples: List[Dict]) -> List[Dict]:
+        """
+        Predict fertilizer recommendations for many soil samples with a single
+        model call. Each sample has the same shape as for
+        predict_fertilizer_recommendation.
+        """
+        if not soil_samples:
+            return []
+        
         if self.fertilizer_model is None:
-            return {
-                "fertilizer_type": "NPK 20-20-20",
-                "amount_per_acre": 50.0,
-                "application_method": "Broadcast",
-                "timing": "Before planting",
-                "reason": "Default recommendation - model not available",
-                "npk_analysis": {"nitrogen": 20, "phosphorus": 20, "potassium": 20},
-                "application_tips": [
-                    "Apply fertilizer evenly across the field",
-                    "Avoid applying during heavy rainfall",
-                    "Water the field after application"
-                ]
-            }
+            return [
+                {
+                    "fertilizer_type": "NPK 20-20-20",
+                    "amount_per_acre": 50.0,
+                    "application_method": "Broadcast",
+                    "timing": "Before planting",
+                    "reason": "Default recommendation - model not available",
+                    "npk_analysis": {"nitrogen": 20, "phosphorus": 20, "potassium": 20},
+                    "application_tips": [
+                        "Apply fertilizer evenly across the field",
+                        "Avoid applying during heavy rainfall",
+                        "Water the field after application"
+                    ]
+                }
+                for _ in soil_samples
+            ]
+        
+        # Dictionaries and unknown model types use the rule-based approach
+        if isinstance(self.fertilizer_model, dict) or not (
+            hasattr(self.fertilizer_model, 'predict') or hasattr(self.fertilizer_model, 'predict_proba')
+        ):
+            return self._rule_based_fertilizer_recommendations(soil_samples)
         
         try:
-            # Check what type of model we have
-            print(f"Fertilizer model type: {type(self.fertilizer_model)}")
-            
             # Prepare input data for the model
-            input_data = np.array([[
-                soil_data.get('soil_ph', 6.5),
-                soil_data.get('organic_matter', 2.0),
-                soil_data.get('nitrogen', 50.0),
-                soil_data.get('phosphorus', 30.0),
-                soil_data.get('potassium', 100.0),
-                soil_data.get('area_acres', 1.0)
-            ]])
+            input_data = self._fertilizer_model_input(self.fertilizer_model, soil_samples)
             
             # Make prediction based on model type
             if hasattr(self.fertilizer_model, 'predict'):
                 # Standard sklearn model
-                prediction = self.fertilizer_model.predict(input_data)
-            elif hasattr(self.fertilizer_model, 'predict_proba'):
-                # Model with probability prediction
-                prediction = self.fertilizer_model.predict_proba(input_data)
-                prediction = np.argmax(prediction, axis=1)
-            elif isinstance(self.fertilizer_model, dict):
-                # If it's a dictionary, use rule-based approach
-                print("Model is a dictionary, using rule-based approach")
-                return self._rule_based_fertilizer_recommendation(soil_data)
+                with MODEL_INFERENCE_SECONDS.time("fertilizer_model"):
+                    predictions = self.fertilizer_model.predict(input_data)
             else:
-                # Fallback to rule-based approach
-                print("Unknown model type, using rule-based approach")
-                return self._rule_based_fertilizer_recommendation(soil_data)
+                # Model with probability prediction
+                with MODEL_INFERENCE_SECONDS.time("fertilizer_model"):
+                    predictions = np.argmax(self.fertilizer_model.predict_proba(input_data), axis=1)
             
             # Map prediction to fertilizer recommendation
             fertilizer_types = ["NPK 20-20-20", "Urea", "DAP", "MOP", "Organic Compost"]
             application_methods = ["Broadcast", "Side dressing", "Foliar spray", "Deep placement"]
             
-            # Handle different prediction formats
-            if hasattr(prediction, '__len__') and len(prediction) > 0:
-                pred_value = prediction[0] if hasattr(prediction[0], '__len__') else prediction[0]
+            labels = np.asarray(predictions).reshape(len(soil_samples))
+            if labels.dtype.kind in "biuf":
+                pred_values = labels.astype(float)
+                pred_indices = pred_values.astype(int)
+                amounts = np.clip(pred_values * 10, 20.0, 100.0)  # Scale to reasonable range
+                fertilizer_names = [fertilizer_types[pred_index % len(fertilizer_types)] for pred_index in pred_indices]
             else:
-                pred_value = prediction
-            
-            fertilizer_type = fertilizer_types[int(pred_value) % len(fertilizer_types)]
-            amount = max(20.0, min(100.0, float(pred_value) * 10))  # Scale to reasonable range
-            
-            # Extract NPK values from fertilizer type
-            npk_values = self._extract_npk_from_fertilizer(fertilizer_type)
+                # Classifiers trained on fertilizer names predict the name itself
+                pred_indices = np.searchsorted(self.fertilizer_model.classes_, labels)
+                amounts = np.full(len(labels), 50.0)
+                fertilizer_names = [str(label) for label in labels]
             
-            return {
-                "fertilizer_type": fertilizer_type,
-                "amount_per_acre": float(amount),
-                "application_method": application_methods[int(pred_value) % len(application_methods)],
-                "timing": "Before planting and during growth stages",
-                "reason": f"Based on soil analysis - pH: {soil_data.get('soil_ph', 6.5)}, Organic matter: {soil_data.get('organic_matter', 2.0)}%",
-                "npk_analysis": npk_values,
-                "application_tips": [
-                    "Apply fertilizer evenly across the field",
-                    "Avoid applying during heavy rainfall",
-                    "Water the field after application",
-                    "Store fertilizer in a dry, cool place"
-                ]
-            }
+            recommendations = []
+            for soil_data, pred_index, amount, fertilizer_type in zip(soil_samples, pred_indices, amounts, fertilizer_names):
+                recommendations.append({
+                    "fertilizer_type": fertilizer_type,
+                    "amount_per_acre": float(amount),
+                    "application_method": application_methods[pred_index % len(application_methods)],
+                    "timing": "Before planting and during growth stages",
+                    "reason": f"Based on soil analysis - pH: {soil_data.get('soil_ph', 6.5)}, Organic matter: {soil_data.get('organic_matter', 2.0)}%",
+                    "npk_analysis": self._extract_npk_from_fertilizer(fertilizer_type),
+                    "application_tips": [
+                        "Apply fertilizer evenly across the field",
+                        "Avoid applying during heavy rainfall",
+                        "Water the field after application",
+                        "Store fertilizer in a dry, cool place"
+                    ]
+                })
+            return recommendations
             
         except Exception as e:
             print(f"Error in fertilizer prediction: {e}")
             # Fallback to rule-based approach
-            return self._rule_based_fertilizer_recommendation(soil_data)
+            return self._rule_based_fertilizer_recommendations(soil_samples)
     
     def _rule_based_fertilizer_recommendation(self, soil_data: Dict) -> Dict:
         """
         Rule-based fertilizer recommendation as fallback
         """
-        soil_ph = soil_data.get('soil_ph', 6.5)
-        organic_matter = soil_data.get('organic_matter', 2.0)
-        nitrogen = soil_data.get('nitrogen', 50.0)
-        phosphorus = soil_data.get('phosphorus', 30.0)
-        potassium = soil_data.get('potassium', 100.0)
+        return self._rule_based_fertilizer_recommendations([soil_data])[0]
+    
+    def _rule_based_fertilizer_recommendations(self, soil_samples: List[Dict]) -> List[Dict]:
+        """
+        Vectorised rule-based fertilizer recommendations for many soil samples
+        """
+        features = self._fertilizer_feature_matrix(soil_samples)
+        soil_ph, organic_matter, nitrogen, phosphorus, potassium = features[:, :5].T
         
-        # Determine fertilizer type based on soil conditions
-        if soil_ph < 6.0:
-            fertilizer_type = "Lime + NPK 15-15-15"
-            amount = 60.0
-        elif soil_ph > 8.0:
-            fertilizer_type = "Sulfur + NPK 20-20-20"
-            amount = 45.0
-        elif organic_matter < 1.0:
-            fertilizer_type = "Organic Compost + NPK 20-20-20"
-            amount = 70.0
-        elif nitrogen < 30:
-            fertilizer_type = "Urea + NPK 20-20-20"
-            amount = 55.0
-        elif phosphorus < 20:
-            fertilizer_type = "DAP + NPK 20-20-20"
-            amount = 50.0
-        elif potassium < 80:
-            fertilizer_type = "MOP + NPK 20-20-20"
-            amount = 50.0
-        else:
-            fertilizer_type = "NPK 20-20-20"
-            amount = 50.0
+        # Determine fertilizer type based on soil conditions, first matching rule wins
+        conditions = [
+            soil_ph < 6.0,
+            soil_ph > 8.0,
+            organic_matter < 1.0,
+            nitrogen < 30,
+            phosphorus < 20,
+            potassium < 80
+        ]
+        fertilizer_types = np.select(conditions, [
+            "Lime + NPK 15-15-15",
+            "Sulfur + NPK 20-20-20",
+            "Organic Compost + NPK 20-20-20",
+            "Urea + NPK 20-20-20",
+            "DAP + NPK 20-20-20",
+            "MOP + NPK 20-20-20"
+        ], "NPK 20-20-20")
+        amounts = np.select(conditions, [60.0, 45.0, 70.0, 55.0, 50.0, 50.0], 50.0)
         
         # Determine application method
-        if amount > 60:
-            application_method = "Broadcast"
-        else:
-            application_method = "Side dressing"
-        
-        # Extract NPK values from fertilizer type
-        npk_values = self._extract_npk_from_fertilizer(fertilizer_type)
+        application_methods = np.where(amounts > 60, "Broadcast", "Side dressing")
         
-        return {
-            "fertilizer_type": fertilizer_type,
-            "amount_per_acre": amount,
-            "application_method": application_method,
-            "timing": "Before planting and during growth stages",
-            "reason": f"Rule-based recommendation - pH: {soil_ph}, Organic matter: {organic_matter}%, N: {nitrogen}, P: {phosphorus}, K: {potassium}",
-            "npk_analysis": npk_values,
-            "application_tips": [
-                "Apply fertilizer evenly across the field",
-                "Avoid applying during heavy rainfall",
-                "Water the field after application",
-                "Store fertilizer in a dry, cool place"
-            ]
-        }
+        recommendations = []
+        for i in range(len(soil_samples)):
+            fertilizer_type = str(fertilizer_types[i])
+            recommendations.append({
+                "fertilizer_type": fertilizer_type,
+                "amount_per_acre": float(amounts[i]),
+                "application_method": str(application_methods[i]),
+                "timing": "Before planting and during growth stages",
+                "reason": f"Rule-based recommendation - pH: {soil_ph[i]}, Organic matter: {organic_matter[i]}%, N: {nitrogen[i]}, P: {phosphorus[i]}, K: {potassium[i]}",
+                "npk_analysis": self._extract_npk_from_fertilizer(fertilizer_type),
+                "application_tips": [
+                    "Apply fertilizer evenly across the field",
+                    "Avoid applying during heavy rainfall",
+                    "Water the field after application",
+                    "Store fertilizer in a dry, cool place"
+                ]
+            })
+        return recommendations
     
     def _extract_npk_from_fertilizer(self, fertilizer_type: str) -> Dict:
         """
@@ -223,63 +685,130 @@ class MLModelManager:
         
         return npk_values
     
+    def _preprocess_disease_image(self, image_path: str) -> np.ndarray:
+        """Load an image from disk and turn it into a normalized 224x224 array"""
+        with IMAGE_PREPROCESS_SECONDS.time("file"), Image.open(image_path) as img:
+            return prepare_disease_image(img)
+    
+    def _preprocess_disease_image_bytes(self, image_bytes: bytes) -> np.ndarray:
+        """Decode an image held in memory and turn it into a normalized 224x224 array"""
+        with IMAGE_PREPROCESS_SECONDS.time("upload"), Image.open(io.BytesIO(image_bytes)) as img:
+            return prepare_disease_image(img)
+    
+    def _predict_disease_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Run the disease model on a stacked batch of preprocessed images"""
+        return self.disease_model.predict(batch, verbose=0)
+    
+    def _build_disease_result(self, prediction: np.ndarray) -> Dict:
+        """Turn one row of model output into a disease detection result"""
+        predicted_class_idx = np.argmax(prediction)
+        confidence = float(prediction[predicted_class_idx])
+        
+        # Get disease name
+        disease_name = self.disease_class_names.get(str(predicted_class_idx), "Unknown Disease")
+        
+        # Determine severity based on confidence
+        if confidence > 0.8:
+            severity = "High"
+        elif confidence > 0.6:
+            severity = "Medium"
+        else:
+            severity = "Low"
+        
+        # Get treatment and prevention recommendations
+        treatment_recommendations, prevention_tips = self._get_disease_recommendations(disease_name)
+        
+        return {
+            "disease_name": disease_name,
+            "confidence": confidence,
+            "severity": severity,
+            "treatment_recommendations": treatment_recommendations,
+            "prevention_tips": prevention_tips
+        }
+    
+    def _disease_model_unavailable_result(self) -> Dict:
+        return {
+            "disease_name": "Unknown",
+            "confidence": 0.0,
+            "severity": "Unknown",
+            "treatment_recommendations": ["Consult with agricultural expert"],
+            "prevention_tips": ["Maintain proper plant hygiene", "Monitor regularly"]
+        }
+    
+    def _disease_error_result(self) -> Dict:
+        return {
+            "disease_name": "Error in detection",
+            "confidence": 0.0,
+            "severity": "Unknown",
+            "treatment_recommendations": ["Unable to process image", "Consult with agricultural expert"],
+            "prevention_tips": ["Maintain proper plant hygiene", "Monitor regularly"]
+        }
+    
     def predict_disease(self, image_path: str) -> Dict:
         """
         Predict plant disease from image
         """
         if self.disease_model is None or self.disease_class_names is None:
-            return {
-                "disease_name": "Unknown",
-                "confidence": 0.0,
-                "severity": "Unknown",
-                "treatment_recommendations": ["Consult with agricultural expert"],
-                "prevention_tips": ["Maintain proper plant hygiene", "Monitor regularly"]
-            }
+            return self._disease_model_unavailable_result()
         
         try:
-            # Load and preprocess image
-            img = Image.open(image_path)
-            img = img.resize((224, 224))  # Adjust size based on your model's requirements
-            img_array = image.img_to_array(img)
-            img_array = np.expand_dims(img_array, axis=0)
-            img_array = img_array / 255.0  # Normalize
+            img_array = self._preprocess_disease_image(image_path)
+            prediction = self.disease_queue.submit(img_array).result()
+            return self._build_disease_result(prediction)
             
-            # Make prediction
-            predictions = self.disease_model.predict(img_array)
-            predicted_class_idx = np.argmax(predictions[0])
-            confidence = float(predictions[0][predicted_class_idx])
-            
-            # Get disease name
-            disease_name = self.disease_class_names.get(str(predicted_class_idx), "Unknown Disease")
-            
-            # Determine severity based on confidence
-            if confidence > 0.8:
-                severity = "High"
-            elif confidence > 0.6:
-                severity = "Medium"
-            else:
-                severity = "Low"
-            
-            # Get treatment and prevention recommendations
-            treatment_recommendations, prevention_tips = self._get_disease_recommendations(disease_name)
-            
-            return {
-                "disease_name": disease_name,
-                "confidence": confidence,
-                "severity": severity,
-                "treatment_recommendations": treatment_recommendations,
-                "prevention_tips": prevention_tips
-            }
+        except Exception as e:
+            print(f"Error in disease prediction: {e}")
+            return self._disease_error_result()
+    
+    async def predict_disease_async(self, image_path: str) -> Dict:
+        """
+        Predict plant disease from image without blocking the event loop.
+        Concurrent calls are batched together by the inference queue.
+        """
+        return await self._predict_disease_async(self._preprocess_disease_image, image_path)
+    
+    async def predict_disease_bytes_async(self, image_bytes: bytes, content_hash: Optional[str] = None) -> Dict:
+        """
+        Predict plant disease from raw image bytes, decoding straight from memory.
+        Results are cached by content hash, so re-uploads of the same image
+        skip inference.
+        """
+        if content_hash is None:
+            content_hash = hashlib.sha256(image_bytes).hexdigest()
+        return await self._predict_disease_async(
+            self._preprocess_disease_image_bytes, image_bytes,
+            cache_key=self._prediction_cache_key(content_hash)
+        )
+    
+    def _prediction_cache_key(self, content_hash: str) -> str:
+        """Cache key tying a prediction to the image and the model versions that produced it"""
+        versions = [
+            self.model_versions.get(name, {}).get("version", "none")
+            for name in ("disease_model", "disease_class_names")
+        ]
+        return ":".join(versions + [content_hash])
+    
+    async def _predict_disease_async(self, preprocess: Callable, source, cache_key: Optional[str] = None) -> Dict:
+        if self.disease_model is None or self.disease_class_names is None:
+            return self._disease_model_unavailable_result()
+        
+        if cache_key is not None:
+            cached = self.prediction_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            img_array = await asyncio.to_thread(preprocess, source)
+            prediction = await asyncio.wrap_future(self.disease_queue.submit(img_array))
+            result = self._build_disease_result(prediction)
             
         except Exception as e:
             print(f"Error in disease prediction: {e}")
-            return {
-                "disease_name": "Error in detection",
-                "confidence": 0.0,
-                "severity": "Unknown",
-                "treatment_recommendations": ["Unable to process image", "Consult with agricultural expert"],
-                "prevention_tips": ["Maintain proper plant hygiene", "Monitor regularly"]
-            }
+            return self._disease_error_result()
+        
+        if cache_key is not None:
+            self.prediction_cache.put(cache_key, result)
+        return result
     
     def _get_disease_recommendations(self, disease_name: str) -> Tuple[List[str], List[str]]:
         """Get treatment and prevention recommendations for specific diseases"""
@@ -317,6 +846,46 @@ class MLModelManager:
             ["Regular monitoring", "Maintain plant health", "Proper cultural practices"]
         )
     
+    def predict_irrigation_schedule_batch(self, temperature, humidity, rainfall, crop_stages, soil_types) -> Dict[str, np.ndarray]:
+        """
+        Vectorised irrigation schedule for many crops (and forecast horizons) at once.
+        All inputs are broadcast against each other, so per-farm weather can be
+        combined with per-crop stages, or a (crops, days) forecast grid.
+        Water amounts are returned unrounded.
+        """
+        temperature = np.asarray(temperature, dtype=float)
+        humidity = np.asarray(humidity, dtype=float)
+        rainfall = np.asarray(rainfall, dtype=float)
+        stage_multiplier = _lookup_multipliers(crop_stages, IRRIGATION_STAGE_MULTIPLIERS)
+        soil_multiplier = _lookup_multipliers(soil_types, IRRIGATION_SOIL_MULTIPLIERS)
+        
+        # Calculate water requirement based on conditions
+        base_water = 20  # liters per day per acre
+        
+        # Adjust for temperature
+        water_multiplier = np.select([temperature > 30, temperature > 25], [1.5, 1.2], 1.0)
+        
+        # Adjust for humidity
+        water_multiplier = water_multiplier * np.select([humidity < 40, humidity > 80], [1.3, 0.7], 1.0)
+        
+        # Adjust for crop stage and soil type
+        water_multiplier = water_multiplier * stage_multiplier * soil_multiplier
+        
+        # Reduce water if recent rainfall (mm)
+        water_multiplier = water_multiplier * np.select([rainfall > 10, rainfall > 5], [0.3, 0.6], 1.0)
+        
+        recommended_water = base_water * water_multiplier
+        
+        return {
+            "recommended_water_amount": recommended_water,
+            "frequency": np.select(
+                [recommended_water > 30, recommended_water > 15], ["daily", "every_2_days"], "weekly"
+            ),
+            "best_time": np.broadcast_to(
+                np.where(temperature > 30, "early_morning", "evening"), recommended_water.shape
+            ),
+        }
+    
     def predict_irrigation_schedule(self, weather_data: Dict, crop_data: Dict, soil_data: Dict) -> Dict:
         """
         Predict irrigation schedule based on weather, crop, and soil data
@@ -331,68 +900,15 @@ class MLModelManager:
             crop_stage = crop_data.get('current_stage', 'vegetative')
             soil_type = soil_data.get('soil_type', 'loamy')
             
-            # Calculate water requirement based on conditions
-            base_water = 20  # liters per day per acre
-            
-            # Adjust for temperature
-            if temperature > 30:
-                water_multiplier = 1.5
-            elif temperature > 25:
-                water_multiplier = 1.2
-            else:
-                water_multiplier = 1.0
-            
-            # Adjust for humidity
-            if humidity < 40:
-                water_multiplier *= 1.3
-            elif humidity > 80:
-                water_multiplier *= 0.7
-            
-            # Adjust for crop stage
-            stage_multipliers = {
-                'seedling': 0.5,
-                'vegetative': 1.0,
-                'flowering': 1.3,
-                'fruiting': 1.5,
-                'harvesting': 0.8
-            }
-            water_multiplier *= stage_multipliers.get(crop_stage, 1.0)
-            
-            # Adjust for soil type
-            soil_multipliers = {
-                'sandy': 1.3,
-                'loamy': 1.0,
-                'clay': 0.8
-            }
-            water_multiplier *= soil_multipliers.get(soil_type, 1.0)
-            
-            # Reduce water if recent rainfall
-            if rainfall > 10:  # mm
-                water_multiplier *= 0.3
-            elif rainfall > 5:
-                water_multiplier *= 0.6
-            
-            recommended_water = base_water * water_multiplier
-            
-            # Determine frequency
-            if recommended_water > 30:
-                frequency = "daily"
-            elif recommended_water > 15:
-                frequency = "every_2_days"
-            else:
-                frequency = "weekly"
-            
-            # Best time for irrigation
-            if temperature > 30:
-                best_time = "early_morning"
-            else:
-                best_time = "evening"
+            schedule = self.predict_irrigation_schedule_batch(
+                temperature, humidity, rainfall, crop_stage, soil_type
+            )
             
             return {
-                "recommended_water_amount": round(recommended_water, 2),
-                "frequency": frequency,
-                "best_time": best_time,
-                "reason": f"Based on temperature: {temperature}°C, humidity: {humidity}%, rainfall: {rainfall}mm, crop stage: {crop_stage}"
+                "recommended_water_amount": round(float(schedule["recommended_water_amount"]), 2),
+                "frequency": str(schedule["frequency"]),
+                "best_time": str(schedule["best_time"]),
+                "reason": irrigation_reason(temperature, humidity, rainfall, crop_stage)
             }
             
         except Exception as e:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -59,11 +59,18 @@ class Recommendation(Base):
     description = Column(Text, nullable=False)
     priority = Column(String(20), nullable=False)  # low, medium, high, urgent
     status = Column(String(20), default="pending")  # pending, applied, dismissed
+    dedupe_key = Column(String(100), nullable=True)  # farm:crop:rule:day for generated recommendations
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     farm = relationship("Farm", back_populates="recommendations")
     crop = relationship("Crop", back_populates="recommendations")
+    
+    __table_args__ = (
+        # Named as in migration 0002, so create_all() and alembic build the same schema
+        UniqueConstraint("dedupe_key", name="uq_recommendations_dedupe_key"),
+        Index("ix_recommendations_farm_id_created_at", "farm_id", "created_at"),
+    )
 
 class WeatherData(Base):
     __tablename__ = "weather_data"
@@ -77,6 +84,10 @@ class WeatherData(Base):
     recorded_at = Column(DateTime(timezone=True), server_default=func.now())
     
     farm = relationship("Farm")
+    
+    __table_args__ = (
+        Index("ix_weather_data_farm_id_recorded_at", "farm_id", "recorded_at"),
+    )
 
 class DiseaseDetection(Base):
     __tablename__ = "disease_detections"
@@ -91,3 +102,7 @@ class DiseaseDetection(Base):
     
     farm = relationship("Farm")
     crop = relationship("Crop")
+    
+    __table_args__ = (
+        Index("ix_disease_detections_farm_id_detection_date", "farm_id", "detection_date"),
+    )
@@ -0,0 +1,77 @@
+"""
+Keyset (cursor) pagination for farm history endpoints
+
+Pages are ordered newest first by (timestamp, id). The cursor encodes the
+last row of a page, and the next page starts strictly after it, so every
+page is an index range scan on (farm_id, timestamp) no matter how deep the
+client has paged.
+"""
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Millisecond precision, the finest SQLite's strftime offers
+SQLITE_TIME_FORMAT = "%Y-%m-%d %H:%M:%f"
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just past the given row"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _time_sort_key(db: AsyncSession, time_column):
+    """
+    Column expression and cursor value converter to page on. SQLite stores
+    timestamps as text, with or without fractional seconds depending on who
+    wrote them (CURRENT_TIMESTAMP or a bound datetime), so both sides are
+    compared in one fixed format there. Cursors are built from the
+    expression's value, so converting them back is exact.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return time_column, lambda timestamp: timestamp
+    return (
+        func.strftime(SQLITE_TIME_FORMAT, time_column),
+        lambda timestamp: timestamp.strftime("%Y-%m-%d %H:%M:%S.") + f"{timestamp.microsecond // 1000:03d}",
+    )
+
+async def fetch_page(db: AsyncSession, query, time_column, id_column,
+                     cursor: Optional[str], limit: int) -> Tuple[List, Optional[str]]:
+    """Run query for one page, newest first; returns the rows and the cursor of the next page"""
+    sort_column, sort_value = _time_sort_key(db, time_column)
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value(timestamp),
+            and_(sort_column == sort_value(timestamp), id_column < row_id)
+        ))
+
+    # The cursor carries the sort key as the database computed it
+    query = query.add_columns(sort_column).order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    rows = result.all()
+
+    page = [row[0] for row in rows[:limit]]
+    if len(rows) <= limit:
+        return page, None
+    last, last_key = rows[limit - 1]
+    if isinstance(last_key, str):
+        last_key = datetime.fromisoformat(last_key)
+    return page, encode_cursor(last_key, getattr(last, id_column.key))
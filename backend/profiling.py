@@ -0,0 +1,174 @@
+"""
+On-demand request profiling for Agricultural Advisory System
+
+A request carrying the PROFILING_TOKEN in the X-Profile-Token header is run
+under a profiler and the result is written to PROFILE_DIR. The token is
+not accepted as a query parameter, which would end up in access logs.
+The response gets an X-Profile-Id header naming the file, which
+can be downloaded from /profiles/{name}.
+
+pyinstrument is used when it is installed: it samples wall-clock time and
+follows awaits, so time spent waiting on the database or the weather API
+shows up in the call tree (HTML report). Otherwise the standard library
+cProfile is used (.prof file, open with pstats or snakeviz); it records the
+event loop thread only, including other requests served in the meantime.
+
+Without PROFILING_TOKEN set, or for requests without the token, nothing is
+profiled and the middleware only compares one header.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException, status
+
+load_dotenv()
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# The profile listing/download endpoints take the token too but are never profiled
+PROFILES_PATH = "/profiles"
+
+_header_key = PROFILE_HEADER.lower().encode()
+# cProfile cannot profile two requests at once; later ones run unprofiled
+_cprofile_lock = threading.Lock()
+
+def is_valid_token(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILING_TOKEN)
+
+def _requested_token(scope) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == _header_key:
+            return value.decode("latin-1")
+    return None
+
+def _profile_name(scope, extension: str) -> str:
+    path = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{scope['method'].lower()}-{path[:80]}.{extension}"
+
+def _prune_profiles():
+    profiles = list_profiles()
+    for profile in profiles[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, profile["name"]))
+        except OSError:
+            pass
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests carrying the profiling token"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (not PROFILING_TOKEN or scope["type"] != "http" or scope["path"].startswith(PROFILES_PATH)
+                or not is_valid_token(_requested_token(scope))):
+            await self.app(scope, receive, send)
+            return
+
+        if SamplingProfiler is not None:
+            profiler = SamplingProfiler(interval=PROFILE_SAMPLE_INTERVAL_MS / 1000.0, async_mode="enabled")
+            name = _profile_name(scope, "html")
+        elif _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            name = _profile_name(scope, "prof")
+        else:
+            print(f"Profiler busy, not profiling {scope['method']} {scope['path']}")
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER.lower().encode(), name.encode())]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            if SamplingProfiler is not None:
+                profiler.start()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    profiler.stop()
+            else:
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    profiler.disable()
+        finally:
+            if SamplingProfiler is None:
+                _cprofile_lock.release()
+            # Rendering and writing the report takes a while; keep it off the event loop
+            await asyncio.to_thread(self._save, profiler, name)
+            print(f"Profiled {scope['method']} {scope['path']} in {time.perf_counter() - started:.3f}s -> {name}")
+
+    def _save(self, profiler, name: str):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, name)
+            if SamplingProfiler is not None:
+                with open(path, "w") as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.dump_stats(path)
+            _prune_profiles()
+        except Exception as e:
+            print(f"Error saving profile {name}: {e}")
+
+def list_profiles() -> List[Dict]:
+    """Saved profiles, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file() and entry.name.endswith((".html", ".prof")):
+            stat = entry.stat()
+            profiles.append({
+                "name": entry.name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            })
+    profiles.sort(key=lambda profile: profile["name"], reverse=True)
+    return profiles
+
+def profile_path(name: str) -> str:
+    """Path of a saved profile; raises 404 for unknown names"""
+    path = os.path.join(PROFILE_DIR, name)
+    if os.path.basename(name) != name or not name.endswith((".html", ".prof")) or not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return path
+
+async def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    """Dependency guarding the profile endpoints with the profiling token"""
+    if not PROFILING_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling is disabled"
+        )
+    if not is_valid_token(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid profiling token"
+        )
@@ -1,27 +1,244 @@
 #!/usr/bin/env python3
 """
-Development server runner for Agricultural Advisory System
+Server runner for Agricultural Advisory System
+
+Development (default): a single uvicorn process with auto-reload.
+
+Production (--production or SERVER_MODE=production): the application and
+the models that can be shared are loaded once in a supervisor process,
+which then forks WORKERS uvicorn workers serving one shared listening
+socket. Forked workers share the preloaded model weights copy-on-write
+instead of each loading their own copy. The supervisor prints a readiness
+report as each worker comes up, restarts workers that die, and on
+SIGTERM/SIGINT lets every worker finish its in-flight requests and run its
+shutdown hooks before exiting.
 """
 
-import uvicorn
+import argparse
+import asyncio
+import gc
+import multiprocessing
 import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Dict, Optional
+
+import uvicorn
 from dotenv import load_dotenv
 
-def main():
-    """Run the development server"""
+def _run_worker(config: uvicorn.Config, sock, index: int, report_conn):
+    """Body of a forked worker process; never returns"""
+    # Only the supervisor receives Ctrl+C, it forwards a single SIGTERM for a graceful drain
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    forked_at = time.perf_counter()
+    os.environ["SERVER_WORKER"] = str(index)
+
+    from database import async_engine, engine
+    from ml_models import ml_manager
+    from scheduler import recommendation_scheduler
+
+    # Connections opened by the supervisor must not be shared with it
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    # One scheduler is enough; the other workers only serve requests
+    if index > 0:
+        recommendation_scheduler.enabled = False
+    ml_manager.after_fork()
+
+    server = uvicorn.Server(config)
+
+    async def serve():
+        task = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started and not task.done():
+            await asyncio.sleep(0.05)
+        if server.started:
+            report_conn.send({
+                "worker": index,
+                "boot_seconds": round(time.perf_counter() - forked_at, 3),
+                **ml_manager.get_readiness()
+            })
+        await task
+
+    exit_code = 0
+    try:
+        asyncio.run(serve())
+    except BaseException as e:
+        print(f"Worker {index} failed: {e!r}")
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+class WorkerSupervisor:
+    """Forks, watches and drains the uvicorn worker processes"""
+
+    def __init__(self, config: uvicorn.Config, sock, workers: int, graceful_timeout: float):
+        self.config = config
+        self.sock = sock
+        self.workers = max(1, workers)
+        self.graceful_timeout = graceful_timeout
+        self._pids: Dict[int, int] = {}
+        self._reports: Dict[int, Dict] = {}
+        self._conns: Dict[int, object] = {}
+        self._should_exit = False
+
+    def _spawn(self, index: int):
+        reader, writer = multiprocessing.Pipe(duplex=False)
+        pid = os.fork()
+        if pid == 0:
+            reader.close()
+            _run_worker(self.config, self.sock, index, writer)
+        writer.close()
+        self._pids[index] = pid
+        self._conns[index] = reader
+        self._reports.pop(index, None)
+
+    def _handle_exit(self, sig, frame):
+        self._should_exit = True
+
+    def _print_report(self, report: Dict):
+        models = ", ".join(
+            f"{name} {info['version']} ({'shared' if info['shared_from_parent'] else 'loaded in worker'})"
+            if info else f"{name} not loaded"
+            for name, info in report["models"].items()
+        )
+        print(f"✅ Worker {report['worker']} (pid {report['pid']}) ready in {report['boot_seconds']:.2f}s: {models}")
+
+    def _read_reports(self, timeout: float):
+        conns = {conn: index for index, conn in self._conns.items()}
+        for conn in wait(list(conns), timeout=timeout):
+            index = conns[conn]
+            try:
+                self._reports[index] = conn.recv()
+            except (EOFError, OSError):
+                # Worker exited; it is reaped below
+                conn.close()
+                del self._conns[index]
+                continue
+            self._print_report(self._reports[index])
+            if len(self._reports) == self.workers:
+                print(f"🚀 All {self.workers} workers ready")
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index = next((index for index, worker_pid in self._pids.items() if worker_pid == pid), None)
+            if index is None:
+                continue
+            del self._pids[index]
+            conn = self._conns.pop(index, None)
+            if conn is not None:
+                conn.close()
+            if self._should_exit:
+                continue
+            print(f"⚠️  Worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+            if index not in self._reports:
+                # Died before becoming ready: back off instead of fork-looping
+                time.sleep(1.0)
+            self._spawn(index)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        for index in range(self.workers):
+            self._spawn(index)
+
+        while not self._should_exit:
+            if self._conns:
+                self._read_reports(timeout=0.5)
+            else:
+                time.sleep(0.5)
+            self._reap()
+
+        self.stop()
+
+    def stop(self):
+        """SIGTERM every worker and wait for them to drain, killing stragglers after the timeout"""
+        print(f"🛑 Draining {len(self._pids)} workers (up to {self.graceful_timeout:.0f}s)...")
+        # The listening socket closes once the workers stop listening too, so new connections are refused
+        self.sock.close()
+        for pid in self._pids.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        # Leave time for shutdown hooks (write-behind flush, inference pool) after the last request
+        deadline = time.monotonic() + self.graceful_timeout + 10.0
+        while self._pids and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for index, pid in list(self._pids.items()):
+            print(f"⚠️  Worker {index} (pid {pid}) did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        print("👋 All workers stopped")
+
+def run_production(host: str, port: int, workers: int, graceful_timeout: float):
+    """Preload the app once, then fork workers that share it copy-on-write"""
+    # Tell ml_models to load only the models that are safe to share across fork()
+    os.environ["MODEL_PRELOAD_FOR_FORK"] = "true"
+
+    started = time.perf_counter()
+    from main import app
+    print(f"📦 Application and shared models preloaded in {time.perf_counter() - started:.2f}s")
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_level="info",
+        timeout_graceful_shutdown=int(graceful_timeout)
+    )
+    sock = config.bind_socket()
+
+    # Move everything loaded so far out of the collector's reach, so that garbage
+    # collection in the workers does not write to (and un-share) those pages
+    gc.freeze()
+
+    WorkerSupervisor(config, sock, workers, graceful_timeout).run()
+
+def main(argv: Optional[list] = None):
+    """Run the development server, or the multi-worker production server"""
     load_dotenv()
-    
+
+    parser = argparse.ArgumentParser(description="Run the Agricultural Advisory System API")
+    parser.add_argument("--production", action="store_true",
+                        default=os.getenv("SERVER_MODE", "development").lower() == "production",
+                        help="Preload models and fork multiple workers (SERVER_MODE=production)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "0")) or os.cpu_count() or 1,
+                        help="Worker processes in production mode (WORKERS, defaults to the CPU count)")
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30")),
+                        help="Seconds workers get to finish in-flight requests on shutdown")
+    args = parser.parse_args(argv)
+
     # Get configuration from environment variables
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     reload = os.getenv("RELOAD", "true").lower() == "true"
-    
+
     print("🌱 Starting Agricultural Advisory System...")
     print(f"📍 Server will be available at: http://{host}:{port}")
     print("📚 API documentation: http://localhost:8000/docs")
     print("🔧 Interactive API: http://localhost:8000/redoc")
     print("\nPress Ctrl+C to stop the server")
-    
+
+    if args.production:
+        print(f"🏭 Production mode: {args.workers} workers")
+        run_production(host, port, args.workers, args.graceful_timeout)
+        return
+
     uvicorn.run(
         "main:app",
         host=host,
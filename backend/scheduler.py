@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Batch recommendation scheduler for Agricultural Advisory System
+
+Generates the day's automatic recommendations for every farm in bulk, either
+from an in-process background worker started with the API or from the
+command line:
+
+    python scheduler.py [--date YYYY-MM-DD] [--farm-id ID ...]
+
+Every recommendation carries an idempotency key built from
+(farm, crop, rule, day), so runs can be repeated or overlap without
+creating duplicates.
+"""
+
+import argparse
+import asyncio
+import os
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from database import AsyncSessionLocal
+from models import Farm, Recommendation
+from weather_service import weather_service
+
+load_dotenv()
+
+def recommendation_key(farm_id: int, crop_id: int, rule: str, day: date) -> str:
+    """Idempotency key for one recommendation rule firing on a given day"""
+    return f"{farm_id}:{crop_id}:{rule}:{day.isoformat()}"
+
+def build_farm_recommendations(farm: Farm, weather_data: Optional[Dict], day: date) -> List[Dict]:
+    """Evaluate the recommendation rules for one farm and return rows to insert"""
+    crops = farm.crops
+    if not crops:
+        return []
+
+    rows = []
+
+    def add(crop_id: int, rule: str, recommendation_type: str, title: str, description: str, priority: str):
+        rows.append({
+            "farm_id": farm.id,
+            "crop_id": crop_id,
+            "recommendation_type": recommendation_type,
+            "title": title,
+            "description": description,
+            "priority": priority,
+            "status": "pending",
+            "dedupe_key": recommendation_key(farm.id, crop_id, rule, day),
+        })
+
+    # Weather-based recommendations use the first crop as reference
+    if weather_data:
+        if weather_data.get('temperature', 0) > 35:
+            add(crops[0].id, "high_temperature", "irrigation", "High Temperature Alert",
+                f"Temperature is {weather_data.get('temperature', 0):.1f}°C. Consider increasing irrigation frequency to prevent heat stress.",
+                "high")
+
+        if weather_data.get('humidity', 0) < 30:
+            add(crops[0].id, "low_humidity", "irrigation", "Low Humidity Alert",
+                f"Humidity is {weather_data.get('humidity', 0):.1f}%. Consider misting or increasing irrigation to maintain soil moisture.",
+                "medium")
+
+        if weather_data.get('wind_speed', 0) > 15:
+            add(crops[0].id, "high_wind", "general", "High Wind Warning",
+                f"Wind speed is {weather_data.get('wind_speed', 0):.1f} km/h. Consider protecting young plants and checking irrigation systems.",
+                "medium")
+
+    # Crop stage recommendations
+    for crop in crops:
+        if crop.current_stage == "seedling":
+            add(crop.id, "seedling_stage", "fertilizer", "Seedling Stage Care",
+                f"Your {crop.crop_name} is in seedling stage. Apply light fertilizer and ensure consistent moisture.",
+                "medium")
+
+        elif crop.current_stage == "flowering":
+            add(crop.id, "flowering_stage", "fertilizer", "Flowering Stage Nutrition",
+                f"Your {crop.crop_name} is flowering. Apply phosphorus-rich fertilizer to support flower development.",
+                "high")
+
+        elif crop.current_stage == "fruiting":
+            add(crop.id, "fruiting_stage", "irrigation", "Fruiting Stage Watering",
+                f"Your {crop.crop_name} is fruiting. Maintain consistent soil moisture for optimal fruit development.",
+                "high")
+
+    # Soil-based recommendations
+    if farm.soil_type == "sandy":
+        add(crops[0].id, "sandy_soil", "fertilizer", "Sandy Soil Management",
+            "Sandy soil drains quickly. Consider adding organic matter and applying fertilizer in smaller, more frequent doses.",
+            "medium")
+
+    elif farm.soil_type == "clay":
+        add(crops[0].id, "clay_soil", "irrigation", "Clay Soil Management",
+            "Clay soil retains water well. Be careful not to overwater and ensure good drainage.",
+            "medium")
+
+    return rows
+
+def insert_ignore_duplicates(dialect_name: str, rows: List[Dict]):
+    """Build a bulk INSERT that skips rows whose dedupe_key already exists"""
+    if dialect_name == "mysql":
+        return mysql.insert(Recommendation).values(rows).prefix_with("IGNORE")
+    if dialect_name == "postgresql":
+        return postgresql.insert(Recommendation).values(rows).on_conflict_do_nothing(index_elements=["dedupe_key"])
+    return sqlite.insert(Recommendation).values(rows).on_conflict_do_nothing(index_elements=["dedupe_key"])
+
+async def generate_recommendations(
+    db: AsyncSession,
+    day: Optional[date] = None,
+    farm_ids: Optional[Sequence[int]] = None,
+    batch_size: int = 500
+) -> Dict:
+    """Generate the day's recommendations for all (or the given) farms"""
+    day = day or date.today()
+    started = datetime.now()
+
+    query = select(Farm).options(selectinload(Farm.crops)).order_by(Farm.id)
+    if farm_ids:
+        query = query.filter(Farm.id.in_(farm_ids))
+    result = await db.execute(query)
+    farms = result.scalars().all()
+
+    dialect_name = db.get_bind().dialect.name
+    pending_rows: List[Dict] = []
+    candidates = 0
+
+    async def flush():
+        if pending_rows:
+            await db.execute(insert_ignore_duplicates(dialect_name, pending_rows))
+            pending_rows.clear()
+
+    # Weather for every farm in one concurrent, deduplicated fetch; no latency budget off the request path
+    farms_with_crops = [farm for farm in farms if farm.crops]
+    try:
+        weather = await weather_service.get_current_weather_many(
+            [(farm.latitude, farm.longitude) for farm in farms_with_crops], latency_budget=False
+        )
+    except Exception as e:
+        print(f"Error getting weather data: {e}")
+        weather = [None] * len(farms_with_crops)
+
+    for farm, weather_data in zip(farms_with_crops, weather):
+        rows = build_farm_recommendations(farm, weather_data, day)
+        candidates += len(rows)
+        pending_rows.extend(rows)
+        if len(pending_rows) >= batch_size:
+            await flush()
+
+    await flush()
+    await db.commit()
+
+    return {
+        "date": day.isoformat(),
+        "farms": len(farms),
+        "candidate_recommendations": candidates,
+        "duration_seconds": round((datetime.now() - started).total_seconds(), 3),
+    }
+
+class RecommendationScheduler:
+    """In-process worker that periodically generates the day's recommendations"""
+
+    def __init__(self):
+        self.enabled = os.getenv("RECOMMENDATION_SCHEDULER_ENABLED", "true").lower() == "true"
+        self.interval_seconds = float(os.getenv("RECOMMENDATION_SCHEDULER_INTERVAL_SECONDS", "3600"))
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self, farm_ids: Optional[Sequence[int]] = None) -> Optional[Dict]:
+        """Generate recommendations now, logging instead of raising on failure"""
+        try:
+            async with AsyncSessionLocal() as db:
+                summary = await generate_recommendations(db, farm_ids=farm_ids)
+        except Exception as e:
+            print(f"Error generating recommendations: {e}")
+            return None
+
+        if not farm_ids:
+            print(f"Generated automatic recommendations for {summary['farms']} farms in {summary['duration_seconds']}s")
+        return summary
+
+    async def _run_forever(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+recommendation_scheduler = RecommendationScheduler()
+
+def main():
+    """Generate recommendations from the command line"""
+    parser = argparse.ArgumentParser(description="Generate daily recommendations for all farms")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Day to generate for (YYYY-MM-DD), defaults to today")
+    parser.add_argument("--farm-id", type=int, action="append", dest="farm_ids", help="Limit the run to these farms")
+    args = parser.parse_args()
+
+    async def run():
+        try:
+            async with AsyncSessionLocal() as db:
+                return await generate_recommendations(db, day=args.date, farm_ids=args.farm_ids)
+        finally:
+            await weather_service.aclose()
+
+    summary = asyncio.run(run())
+    print(f"Generated recommendations for {summary['farms']} farms on {summary['date']} "
+          f"({summary['candidate_recommendations']} candidates, {summary['duration_seconds']}s)")
+
+if __name__ == "__main__":
+    main()
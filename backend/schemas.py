@@ -123,6 +123,17 @@ class DiseaseDetection(DiseaseDetectionBase):
     class Config:
         from_attributes = True
 
+# Overview schemas
+class FarmOverview(Farm):
+    latest_weather: Optional[WeatherData] = None
+    pending_recommendations: int = 0
+
+class FarmsOverview(BaseModel):
+    total_farms: int
+    total_crops: int
+    pending_recommendations: int
+    farms: List[FarmOverview]
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
@@ -138,6 +149,15 @@ class IrrigationRecommendation(BaseModel):
     best_time: str  # morning, evening
     reason: str
 
+class DailyIrrigationPlan(IrrigationRecommendation):
+    date: str
+
+class CropIrrigationPlan(IrrigationRecommendation):
+    farm_id: int
+    crop_id: int
+    crop_name: str
+    forecast: List[DailyIrrigationPlan] = []
+
 class FertilizerRecommendation(BaseModel):
     fertilizer_type: str
     amount_per_acre: float  # in kg
@@ -145,6 +165,21 @@ class FertilizerRecommendation(BaseModel):
     timing: str
     reason: str
 
+class CropFertilizerRecommendation(FertilizerRecommendation):
+    farm_id: int
+    crop_id: int
+    crop_name: str
+
+class SoilSample(BaseModel):
+    soil_type: Optional[str] = None
+    crop_type: Optional[str] = None
+    soil_ph: Optional[float] = None
+    organic_matter: Optional[float] = None
+    nitrogen: Optional[float] = None
+    phosphorus: Optional[float] = None
+    potassium: Optional[float] = None
+    area_acres: Optional[float] = None
+
 class PestDetectionResult(BaseModel):
     disease_name: str
     confidence: float
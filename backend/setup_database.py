@@ -1,19 +1,24 @@
 #!/usr/bin/env python3
 """
 Database setup script for Agricultural Advisory System
-Run this script to create the database and tables
+Run this script to create the database and bring its tables to the latest
+Alembic revision. Tables created earlier with create_all() are stamped with
+the revision they already match before upgrading.
 """
 
 import os
 import sys
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from dotenv import load_dotenv
+from alembic import command
+from alembic.config import Config
 
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database import Base, engine
-from models import Farmer, Farm, Crop, Recommendation, WeatherData, DiseaseDetection
+from database import engine
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 
 def create_database():
     """Create the database if it doesn't exist"""
@@ -40,12 +45,38 @@ def create_database():
     
     return True
 
+def alembic_config() -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    return config
+
+def unversioned_revision(inspector):
+    """
+    Newest revision an unversioned database already matches, for tables
+    built by create_all() before migrations owned the schema; None if empty
+    """
+    if "recommendations" not in inspector.get_table_names():
+        return None
+    indexes = {index["name"] for index in inspector.get_indexes("recommendations")}
+    if "ix_recommendations_farm_id_created_at" in indexes:
+        return "0003"
+    columns = {column["name"] for column in inspector.get_columns("recommendations")}
+    if "dedupe_key" in columns:
+        return "0002"
+    return "0001"
+
 def create_tables():
-    """Create all tables"""
+    """Create or upgrade all tables with the Alembic migrations"""
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        print("All tables created successfully")
+        config = alembic_config()
+        inspector = inspect(engine)
+        if "alembic_version" not in inspector.get_table_names():
+            revision = unversioned_revision(inspector)
+            if revision is not None:
+                print(f"Existing tables match revision {revision}, stamping it")
+                command.stamp(config, revision)
+        command.upgrade(config, "head")
+        print("All tables are up to date")
         return True
     except Exception as e:
         print(f"Error creating tables: {e}")
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+
+# database.py creates its engines at import time
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "import.db"))
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from models import Recommendation
+from pagination import fetch_page
+
+def recommendation_row(**overrides):
+    row = {"farm_id": 1, "crop_id": 1, "recommendation_type": "irrigation", "title": "Irrigate",
+           "description": "Irrigate", "priority": "medium"}
+    row.update(overrides)
+    return row
+
+def page_through(tmp_path, rows, limit):
+    """Insert rows into a fresh SQLite database and return the ids of every page, following the cursor"""
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pages.db'}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            factory = async_sessionmaker(engine, expire_on_commit=False)
+            async with factory() as db:
+                await db.execute(insert(Recommendation), rows)
+                await db.commit()
+
+                pages, cursor = [], None
+                while len(pages) <= len(rows):
+                    page, cursor = await fetch_page(
+                        db, select(Recommendation), Recommendation.created_at, Recommendation.id, cursor, limit
+                    )
+                    pages.append([recommendation.id for recommendation in page])
+                    if cursor is None:
+                        return pages
+                raise AssertionError(f"cursor never ran out: {pages}")
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+def test_rows_sharing_a_timestamp_are_each_returned_once(tmp_path):
+    # One bulk INSERT: every row gets the same CURRENT_TIMESTAMP, stored without fractional seconds
+    pages = page_through(tmp_path, [recommendation_row() for _ in range(7)], limit=2)
+
+    ids = [row_id for page in pages for row_id in page]
+    assert ids == [7, 6, 5, 4, 3, 2, 1]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+
+def test_server_and_client_timestamps_page_in_time_order(tmp_path):
+    rows = [
+        recommendation_row(created_at=datetime(2026, 10, 17, 6, 59, 1, 250000)),
+        recommendation_row(created_at=datetime(2026, 10, 17, 6, 59, 1)),
+        recommendation_row(created_at=datetime(2026, 10, 17, 6, 59, 1)),
+        recommendation_row(created_at=datetime(2026, 10, 17, 6, 59, 0, 999000)),
+        recommendation_row(created_at=datetime(2026, 10, 17, 6, 59, 2)),
+    ]
+    pages = page_through(tmp_path, rows, limit=2)
+
+    assert [row_id for page in pages for row_id in page] == [5, 1, 3, 2, 4]
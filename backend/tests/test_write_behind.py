@@ -0,0 +1,110 @@
+import asyncio
+import os
+import tempfile
+
+# database.py creates its engines at import time
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "import.db"))
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import write_behind
+from database import Base
+from models import WeatherData
+
+def weather_row(**overrides):
+    row = {"farm_id": 1, "temperature": 25.0, "humidity": 60.0, "rainfall": 0.0, "wind_speed": 3.0}
+    row.update(overrides)
+    return row
+
+def run_against(monkeypatch, url: str, scenario):
+    """Run scenario(buffer, count_rows) on one event loop with the buffer writing to url"""
+    async def main():
+        engine = create_async_engine(url)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            factory = async_sessionmaker(engine, expire_on_commit=False)
+            monkeypatch.setattr(write_behind, "AsyncSessionLocal", factory)
+
+            async def count_rows() -> int:
+                async with factory() as db:
+                    return (await db.execute(select(func.count()).select_from(WeatherData))).scalar()
+
+            await scenario(write_behind.WriteBehindBuffer(), count_rows)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+async def write(buffer, rows):
+    for row in rows:
+        buffer.add(WeatherData, **row)
+    await buffer.stop()
+
+def test_flush_writes_rows_in_bulk(monkeypatch, tmp_path):
+    async def scenario(buffer, count_rows):
+        await write(buffer, [weather_row(), weather_row(temperature=26.0)])
+
+        assert await count_rows() == 2
+        assert buffer.get_stats()["rows_written"] == 2
+        assert buffer.get_stats()["pending_rows"] == 0
+
+    run_against(monkeypatch, f"sqlite+aiosqlite:///{tmp_path / 'telemetry.db'}", scenario)
+
+def test_rejected_row_is_dropped_instead_of_requeued(monkeypatch, tmp_path):
+    async def scenario(buffer, count_rows):
+        # temperature is NOT NULL, so this row can never be inserted
+        await write(buffer, [weather_row(), weather_row(temperature=None), weather_row(temperature=27.0)])
+
+        stats = buffer.get_stats()
+        assert await count_rows() == 2
+        assert stats["rows_written"] == 2
+        assert stats["rejected_rows"] == 1
+        assert stats["pending_rows"] == 0
+
+        # Later flushes are not held up by the bad row
+        await write(buffer, [weather_row()])
+        assert await count_rows() == 3
+
+    run_against(monkeypatch, f"sqlite+aiosqlite:///{tmp_path / 'telemetry.db'}", scenario)
+
+def test_missing_table_is_not_retried(monkeypatch, tmp_path):
+    async def main():
+        # No create_all: every insert fails with SQLite's permanent "no such table"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}")
+        try:
+            monkeypatch.setattr(write_behind, "AsyncSessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+            buffer = write_behind.WriteBehindBuffer()
+            await write(buffer, [weather_row(), weather_row()])
+            return buffer.get_stats()
+        finally:
+            await engine.dispose()
+
+    stats = asyncio.run(main())
+    assert stats["pending_rows"] == 0
+    assert stats["rejected_rows"] == 2
+
+class DisconnectedSession:
+    """Stands in for a MySQL session whose connection to the server was lost"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, *args, **kwargs):
+        raise OperationalError("INSERT INTO weather_data", {}, ConnectionError(2006, "MySQL server has gone away"))
+
+def test_connection_failure_requeues_the_batch(monkeypatch):
+    monkeypatch.setattr(write_behind, "AsyncSessionLocal", DisconnectedSession)
+    buffer = write_behind.WriteBehindBuffer()
+
+    asyncio.run(write(buffer, [weather_row(), weather_row()]))
+
+    stats = buffer.get_stats()
+    assert stats["pending_rows"] == 2
+    assert stats["failed_flushes"] == 1
+    assert stats["rejected_rows"] == 0
@@ -1,102 +1,528 @@
-import requests
+import asyncio
+import httpx
 import os
-from typing import Dict, Optional
+import copy
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 import logging
 
+from metrics import WEATHER_FETCH_SECONDS, WEATHER_RESULTS
+
 load_dotenv()
 
-class WeatherService:
-    def __init__(self):
-        self.api_key = os.getenv("OPENWEATHER_API_KEY")
-        self.base_url = "http://api.openweathermap.org/data/2.5"
-        
-    def get_current_weather(self, latitude: float, longitude: float) -> Optional[Dict]:
+class WeatherUnavailable(Exception):
+    """Upstream weather could not be used within this call: circuit open or latency budget spent"""
+
+class GeoGridCache:
+    """
+    Bounded LRU cache for weather responses keyed by a quantised lat/lon
+    grid cell. Entries are fresh for their TTL and can then still be served
+    as stale data for stale_ttl seconds while a refresh runs. Refreshes are
+    single-flight: concurrent refreshes of the same key share one upstream
+    fetch instead of each issuing their own.
+    """
+    
+    def __init__(self, max_entries: int = 10000, grid_degrees: float = 0.01):
+        self.max_entries = max(1, max_entries)
+        self.grid_degrees = grid_degrees
+        # key -> (fresh until, stale until, fetched at (wall clock), value)
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, float, Dict]]" = OrderedDict()
+        self._inflight: Dict[Hashable, "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+    
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Return the grid cell containing the given coordinates"""
+        return (
+            int(round(latitude / self.grid_degrees)),
+            int(round(longitude / self.grid_degrees)),
+        )
+    
+    def get(self, key: Hashable) -> Optional[Tuple[Dict, float, bool]]:
+        """Return (value, fetched_at, fresh) for a fresh or still servable stale entry, else None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            fresh = entry[0] > now
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return copy.deepcopy(entry[3]), entry[2], fresh
+    
+    def refresh(self, key: Hashable, ttl: float, stale_ttl: float,
+                fetch: Callable[[], Awaitable[Dict]]) -> "asyncio.Task":
         """
-        Get current weather data for given coordinates
+        Fetch and store a new value for key in a task on the running event
+        loop; the task resolves to (value, fetched_at). Joins the refresh
+        already running for key, if any.
         """
-        if not self.api_key:
-            logging.warning("OpenWeatherMap API key not found")
-            return self._get_mock_weather_data()
-        
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is not None and not task.done() and task.get_loop() is loop:
+                self.coalesced += 1
+                return task
+            self.refreshes += 1
+            task = self._inflight[key] = loop.create_task(self._run_refresh(key, ttl, stale_ttl, fetch))
+            return task
+    
+    async def _run_refresh(self, key: Hashable, ttl: float, stale_ttl: float,
+                           fetch: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, float]:
         try:
-            url = f"{self.base_url}/weather"
-            params = {
-                "lat": latitude,
-                "lon": longitude,
-                "appid": self.api_key,
-                "units": "metric"
+            value = await fetch()
+            fetched_at = time.time()
+            self.put(key, ttl, stale_ttl, fetched_at, value)
+            return value, fetched_at
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is asyncio.current_task():
+                    del self._inflight[key]
+    
+    def put(self, key: Hashable, ttl: float, stale_ttl: float, fetched_at: float, value: Dict):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + ttl, now + ttl + stale_ttl, fetched_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "grid_degrees": self.grid_degrees,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
             }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream. Closed: calls go through and their
+    outcomes are kept for the last `window` calls; once at least `min_calls`
+    are recorded and the share of failed or slow calls reaches
+    `failure_ratio`, the breaker opens. Open: calls are refused for
+    `open_seconds`. Half-open: one probe call is let through; its outcome
+    closes or re-opens the breaker.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, window: int = 20, min_calls: int = 5, failure_ratio: float = 0.5,
+                 slow_call_seconds: float = 1.0, open_seconds: float = 30.0):
+        self.window = max(1, window)
+        self.min_calls = max(1, min(min_calls, self.window))
+        self.failure_ratio = failure_ratio
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+    
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; in half-open state only the probe may"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+    
+    def record(self, duration: float, succeeded: bool):
+        """Record the outcome of an allowed call; slow successes count as failures"""
+        bad = not succeeded or duration > self.slow_call_seconds
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if bad:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                    logging.info("Weather circuit breaker closed")
+                return
+            if self.state != self.CLOSED:
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio:
+                self._open()
+    
+    def release(self):
+        """Give back an allowed call that was cancelled before it had an outcome"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+    
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+        logging.warning(f"Weather circuit breaker opened for {self.open_seconds:.0f}s")
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
             return {
-                "temperature": data["main"]["temp"],
-                "humidity": data["main"]["humidity"],
-                "pressure": data["main"]["pressure"],
-                "wind_speed": data["wind"]["speed"],
-                "wind_direction": data["wind"].get("deg", 0),
-                "rainfall": data.get("rain", {}).get("1h", 0),
-                "description": data["weather"][0]["description"],
-                "timestamp": data["dt"]
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "trips": self.trips,
+                "rejected": self.rejected,
             }
+
+class WeatherService:
+    """
+    Async OpenWeatherMap client that never makes a request wait on the
+    upstream for longer than WEATHER_LATENCY_BUDGET_SECONDS. Locations are
+    looked up by cache grid cell; a cell with any reading from the last
+    WEATHER_STALE_MAX_SECONDS is answered immediately while it is refreshed
+    in the background, and everything else falls back to mock data. Fetches
+    of one cell are single-flight, go through the circuit breaker and share
+    one pooled keep-alive client. Every reading carries a "freshness" block
+    saying where it came from and how old it is.
+    """
+    
+    def __init__(self):
+        self.api_key = os.getenv("OPENWEATHER_API_KEY")
+        # Point at weather_stub_server.py to exercise the client offline
+        self.base_url = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5").rstrip("/")
+        self.request_timeout = float(os.getenv("WEATHER_REQUEST_TIMEOUT_SECONDS", "10"))
+        self.current_ttl = float(os.getenv("WEATHER_CURRENT_TTL_SECONDS", "600"))
+        self.forecast_ttl = float(os.getenv("WEATHER_FORECAST_TTL_SECONDS", "3600"))
+        self.stale_ttl = float(os.getenv("WEATHER_STALE_MAX_SECONDS", "86400"))
+        self.latency_budget = float(os.getenv("WEATHER_LATENCY_BUDGET_SECONDS", "1.0"))
+        # Send a second, hedged request when the first has not answered after this long; 0 disables hedging
+        self.hedge_after = float(os.getenv("WEATHER_HEDGE_AFTER_SECONDS", "0"))
+        self.cache = GeoGridCache(
+            max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "10000")),
+            grid_degrees=float(os.getenv("WEATHER_CACHE_GRID_DEGREES", "0.01")),
+        )
+        self.breaker = CircuitBreaker(
+            window=int(os.getenv("WEATHER_BREAKER_WINDOW", "20")),
+            min_calls=int(os.getenv("WEATHER_BREAKER_MIN_CALLS", "5")),
+            failure_ratio=float(os.getenv("WEATHER_BREAKER_FAILURE_RATIO", "0.5")),
+            slow_call_seconds=float(os.getenv("WEATHER_BREAKER_SLOW_CALL_SECONDS", str(self.latency_budget))),
+            open_seconds=float(os.getenv("WEATHER_BREAKER_OPEN_SECONDS", "30")),
+        )
+        # Upstream requests in flight at once, hedges included; also the keep-alive pool size
+        self.bulk_concurrency = int(os.getenv("WEATHER_BULK_CONCURRENCY", "32"))
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+        self._fetch_slots: Optional[asyncio.Semaphore] = None
+        self._background_tasks = set()
+        self.budget_exceeded = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    async def _guarded_fetch(self, kind: str, fetch: Callable, *args) -> Dict:
+        """One upstream fetch through the concurrency cap and the circuit breaker, timed for the breaker and for metrics"""
+        client = self._get_async_client()
+        async with self._fetch_slots:
+            if not self.breaker.allow():
+                raise WeatherUnavailable("weather circuit breaker is open")
+            started = time.perf_counter()
+            try:
+                value = await self._hedged_fetch(fetch, client, *args)
+            except asyncio.CancelledError:
+                # Cancelled by the caller, not failed by the upstream
+                self.breaker.release()
+                raise
+            except BaseException:
+                self.breaker.record(time.perf_counter() - started, False)
+                raise
+            duration = time.perf_counter() - started
+            self.breaker.record(duration, True)
+            WEATHER_FETCH_SECONDS.observe(duration, kind)
+            return value
+    
+    async def _hedged_fetch(self, fetch: Callable, *args) -> Dict:
+        """Await fetch, racing a second identical call against it if the first is slower than hedge_after"""
+        if self.hedge_after <= 0:
+            return await fetch(*args)
+        
+        primary = asyncio.ensure_future(fetch(*args))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done:
+                return primary.result()
             
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching weather data: {e}")
-            return self._get_mock_weather_data()
-        except KeyError as e:
-            logging.error(f"Error parsing weather data: {e}")
-            return self._get_mock_weather_data()
-    
-    def get_weather_forecast(self, latitude: float, longitude: float, days: int = 5) -> Optional[Dict]:
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._fetch_in_own_slot(fetch, *args))
+            pending.add(hedge)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            # The loser, or both when the caller is cancelled
+            for task in pending:
+                task.cancel()
+    
+    async def _fetch_in_own_slot(self, fetch: Callable, *args) -> Dict:
+        """A hedge counts against the concurrency cap like any other upstream request"""
+        async with self._fetch_slots:
+            return await fetch(*args)
+    
+    def _log_background_refresh(self, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None and not isinstance(error, WeatherUnavailable):
+            logging.error(f"Weather fetch failed: {error!r}")
+    
+    def _with_freshness(self, kind: str, value: Dict, source: str, fetched_at: Optional[float]) -> Dict:
+        """Tag a reading with where it came from (upstream, cache, stale or fallback) and its age"""
+        value["freshness"] = {
+            "source": source,
+            "fetched_at": datetime.fromtimestamp(fetched_at).isoformat() if fetched_at else None,
+            "age_seconds": round(max(0.0, time.time() - fetched_at), 1) if fetched_at else None,
+            "stale": source in ("stale", "fallback"),
+        }
+        WEATHER_RESULTS.inc(kind, source)
+        return value
+    
+    def _fallback(self, kind: str, value: Dict) -> Dict:
+        return self._with_freshness(kind, value, "fallback", None)
+    
+    def get_stats(self) -> Dict:
+        """Upstream resilience statistics"""
+        return {
+            "latency_budget_seconds": self.latency_budget,
+            "budget_exceeded": self.budget_exceeded,
+            "hedge_after_seconds": self.hedge_after,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "stale_max_seconds": self.stale_ttl,
+            "circuit_breaker": self.breaker.get_stats(),
+        }
+    
+    def _params(self, latitude: float, longitude: float) -> Dict:
+        return {
+            "lat": latitude,
+            "lon": longitude,
+            "appid": self.api_key,
+            "units": "metric"
+        }
+    
+    async def _fetch_current_weather_async(self, client: httpx.AsyncClient, latitude: float, longitude: float) -> Dict:
+        """
+        Fetch current weather from OpenWeatherMap on the pooled client, bypassing the cache
+        """
+        response = await client.get(f"{self.base_url}/weather", params=self._params(latitude, longitude))
+        response.raise_for_status()
+        return self._parse_current_weather(response.json())
+    
+    def _parse_current_weather(self, data: Dict) -> Dict:
+        return {
+            "temperature": data["main"]["temp"],
+            "humidity": data["main"]["humidity"],
+            "pressure": data["main"]["pressure"],
+            "wind_speed": data["wind"]["speed"],
+            "wind_direction": data["wind"].get("deg", 0),
+            "rainfall": data.get("rain", {}).get("1h", 0),
+            "description": data["weather"][0]["description"],
+            "timestamp": data["dt"]
+        }
+    
+    async def _fetch_weather_forecast_async(self, client: httpx.AsyncClient, latitude: float, longitude: float, days: int) -> Dict:
+        """
+        Fetch a weather forecast from OpenWeatherMap on the pooled client, bypassing the cache
+        """
+        response = await client.get(f"{self.base_url}/forecast", params=self._params(latitude, longitude))
+        response.raise_for_status()
+        return self._parse_weather_forecast(response.json(), days)
+    
+    def _parse_weather_forecast(self, data: Dict, days: int) -> Dict:
+        # Process forecast data
+        forecast = []
+        for item in data["list"][:days * 8]:  # 8 forecasts per day (3-hour intervals)
+            forecast.append({
+                "datetime": item["dt_txt"],
+                "temperature": item["main"]["temp"],
+                "humidity": item["main"]["humidity"],
+                "rainfall": item.get("rain", {}).get("3h", 0),
+                "wind_speed": item["wind"]["speed"],
+                "description": item["weather"][0]["description"]
+            })
+        
+        return {
+            "forecast": forecast,
+            "city": data["city"]["name"],
+            "country": data["city"]["country"]
+        }
+    
+    async def get_current_weather_many(self, coordinates: Sequence[Tuple[float, float]],
+                                       latency_budget: bool = True) -> List[Dict]:
         """
-        Get weather forecast for given coordinates
+        Current weather for many (latitude, longitude) pairs, in input order.
+        Locations are deduplicated by cache grid cell and the misses fetched
+        concurrently; with latency_budget=False every fetch is waited for.
         """
+        return await self._get_many(
+            "current", ("current",), self.current_ttl, coordinates, latency_budget,
+            self._fetch_current_weather_async, self._get_mock_weather_data
+        )
+    
+    async def get_weather_forecast_many(self, coordinates: Sequence[Tuple[float, float]], days: int = 5,
+                                        latency_budget: bool = True) -> List[Dict]:
+        """Weather forecasts for many (latitude, longitude) pairs, like get_current_weather_many"""
+        return await self._get_many(
+            "forecast", ("forecast", days), self.forecast_ttl, coordinates, latency_budget,
+            lambda client, latitude, longitude: self._fetch_weather_forecast_async(client, latitude, longitude, days),
+            self._get_mock_forecast_data
+        )
+    
+    async def _get_many(self, kind: str, key_prefix: Tuple, ttl: float, coordinates: Sequence[Tuple[float, float]],
+                        latency_budget: bool, fetch: Callable, mock: Callable[[], Dict]) -> List[Dict]:
         if not self.api_key:
             logging.warning("OpenWeatherMap API key not found")
-            return self._get_mock_forecast_data()
+            return [self._fallback(kind, mock()) for _ in coordinates]
         
-        try:
-            url = f"{self.base_url}/forecast"
-            params = {
-                "lat": latitude,
-                "lon": longitude,
-                "appid": self.api_key,
-                "units": "metric"
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Process forecast data
-            forecast = []
-            for item in data["list"][:days * 8]:  # 8 forecasts per day (3-hour intervals)
-                forecast.append({
-                    "datetime": item["dt_txt"],
-                    "temperature": item["main"]["temp"],
-                    "humidity": item["main"]["humidity"],
-                    "rainfall": item.get("rain", {}).get("3h", 0),
-                    "wind_speed": item["wind"]["speed"],
-                    "description": item["weather"][0]["description"]
-                })
+        keys = [key_prefix + self.cache.cell(latitude, longitude) for latitude, longitude in coordinates]
+        results: Dict[Hashable, Dict] = {}
+        missing: Dict[Hashable, Tuple[float, float]] = {}
+        stale: Dict[Hashable, Tuple[float, float]] = {}
+        for key, location in zip(keys, coordinates):
+            if key in results or key in missing:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = location
+                continue
+            value, fetched_at, fresh = cached
+            if not fresh:
+                stale[key] = location
+            results[key] = self._with_freshness(kind, value, "cache" if fresh else "stale", fetched_at)
+        
+        def refresh(key: Hashable, location: Tuple[float, float]) -> asyncio.Task:
+            # Joins a fetch of the same cell already running for another request
+            task = self.cache.refresh(key, ttl, self.stale_ttl, lambda: self._guarded_fetch(kind, fetch, *location))
+            self._track_background(task)
+            return task
+        
+        # Stale locations were answered already and are refreshed in the background
+        for key, location in stale.items():
+            refresh(key, location)
+        
+        if missing:
+            tasks = {refresh(key, location): key for key, location in missing.items()}
+            done, pending = await asyncio.wait(tasks, timeout=self.latency_budget if latency_budget else None)
             
-            return {
-                "forecast": forecast,
-                "city": data["city"]["name"],
-                "country": data["city"]["country"]
-            }
+            failed = 0
+            for task in done:
+                try:
+                    value, fetched_at = task.result()
+                    results[tasks[task]] = self._with_freshness(kind, copy.deepcopy(value), "upstream", fetched_at)
+                except Exception:
+                    failed += 1
+                    results[tasks[task]] = self._fallback(kind, mock())
+            # Fetches still running fill the cache for later requests
+            for task in pending:
+                results[tasks[task]] = self._fallback(kind, mock())
+            self.budget_exceeded += len(pending)
             
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error fetching forecast data: {e}")
-            return self._get_mock_forecast_data()
-        except KeyError as e:
-            logging.error(f"Error parsing forecast data: {e}")
-            return self._get_mock_forecast_data()
+            if failed or pending:
+                logging.error(
+                    f"{failed} of {len(tasks)} {kind} weather fetches failed and {len(pending)} exceeded "
+                    f"the latency budget"
+                )
+        
+        # Repeated locations get their own copy
+        seen = set()
+        readings = []
+        for key in keys:
+            readings.append(copy.deepcopy(results[key]) if key in seen else results[key])
+            seen.add(key)
+        return readings
+    
+    async def start(self):
+        """Open the pooled client on the running event loop; aclose() must be awaited before the loop ends"""
+        self._get_async_client()
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Keep-alive client for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_client_loop is not loop:
+            self._discard_async_client()
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=self.request_timeout,
+                limits=httpx.Limits(max_connections=self.bulk_concurrency, max_keepalive_connections=self.bulk_concurrency),
+            )
+            self._async_client_loop = loop
+            self._fetch_slots = asyncio.Semaphore(self.bulk_concurrency)
+        return self._async_client
+    
+    def _discard_async_client(self):
+        """Close the client of another event loop this service was used from without aclose()"""
+        client, loop = self._async_client, self._async_client_loop
+        self._async_client = self._async_client_loop = self._fetch_slots = None
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            # A finished loop cannot run aclose() any more; its sockets close once the transports are collected
+            logging.warning("Discarding a weather client left open by a finished event loop")
+    
+    def _track_background(self, task: asyncio.Task):
+        if task in self._background_tasks:
+            return
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        task.add_done_callback(self._log_background_refresh)
+    
+    async def aclose(self):
+        """Cancel running fetches and close the pooled HTTP connections"""
+        for task in list(self._background_tasks):
+            task.cancel()
+        if self._async_client is None:
+            return
+        if self._async_client_loop is asyncio.get_running_loop():
+            client = self._async_client
+            self._async_client = self._async_client_loop = self._fetch_slots = None
+            await client.aclose()
+        else:
+            self._discard_async_client()
     
     def _get_mock_weather_data(self) -> Dict:
         """
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Local OpenWeatherMap stand-in for offline development and load tests
+
+Serves /data/2.5/weather and /data/2.5/forecast in the OpenWeatherMap
+response format. Point the API at it with
+
+    python weather_stub_server.py --port 8090 --latency-ms 80 --jitter-ms 40 --error-rate 0.02
+    OPENWEATHER_BASE_URL=http://127.0.0.1:8090/data/2.5 OPENWEATHER_API_KEY=stub python run_server.py
+
+and WeatherService runs its real HTTP client, cache and error handling code
+against it.
+
+Responses are deterministic: every value derives from --seed and the
+coordinates rounded to 0.01 degrees, and timestamps count from a fixed
+--epoch, so the same request always gets the same body. Responses recorded
+from the real API can be replayed from --recordings:
+weather_<lat>_<lon>.json / forecast_<lat>_<lon>.json (coordinates with two
+decimals) are returned verbatim for those coordinates.
+
+Latency, error and timeout injection are drawn from their own seeded random
+stream and can be changed while the server runs:
+
+    curl -X POST localhost:8090/_stub/config -H 'Content-Type: application/json' -d '{"error_rate": 0.5}'
+    curl localhost:8090/_stub/stats
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from fastapi import Body, FastAPI, Query
+from fastapi.responses import JSONResponse
+
+DEFAULT_EPOCH = 1717200000  # 2024-06-01 00:00 UTC
+FORECAST_STEPS = 40  # 5 days of 3-hour steps, like the real API
+FORECAST_STEP_SECONDS = 3 * 3600
+ERROR_STATUS_CODES = (429, 500, 502, 503)
+
+# (description, main group, condition id, icon); rain is reported only for the rainy ones
+CONDITIONS = [
+    ("clear sky", "Clear", 800, "01d"),
+    ("few clouds", "Clouds", 801, "02d"),
+    ("scattered clouds", "Clouds", 802, "03d"),
+    ("broken clouds", "Clouds", 803, "04d"),
+    ("light rain", "Rain", 500, "10d"),
+    ("moderate rain", "Rain", 501, "10d"),
+]
+
+# Fault injection knobs that POST /_stub/config may change
+STUB_CONFIG_KEYS = ("latency_ms", "jitter_ms", "error_rate", "timeout_rate", "timeout_seconds")
+
+class WeatherStub:
+    """Seeded per-coordinate weather generator with latency, error and timeout injection"""
+
+    def __init__(self, seed: int = 42, epoch: int = DEFAULT_EPOCH, recordings_dir: Optional[str] = None,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, timeout_seconds: float = 30.0):
+        self.seed = seed
+        self.epoch = epoch
+        self.recordings_dir = recordings_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self._faults = random.Random(f"faults:{seed}")
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "replayed": 0}
+
+    def config(self) -> Dict:
+        return {key: getattr(self, key) for key in STUB_CONFIG_KEYS}
+
+    def update_config(self, changes: Dict) -> Dict:
+        for key, value in changes.items():
+            if key not in STUB_CONFIG_KEYS:
+                raise ValueError(f"Unknown setting {key!r}, expected one of {', '.join(STUB_CONFIG_KEYS)}")
+            setattr(self, key, float(value))
+        return self.config()
+
+    async def inject_faults(self) -> Optional[JSONResponse]:
+        """Sleep for the simulated latency; return an error response if this request should fail"""
+        self.stats["requests"] += 1
+        roll = self._faults.random()
+        delay = self.latency_ms + self._faults.uniform(0.0, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+
+        if roll < self.timeout_rate:
+            # Hold the connection long enough for the client's timeout to fire first
+            self.stats["timeouts"] += 1
+            await asyncio.sleep(self.timeout_seconds)
+            return JSONResponse({"cod": 504, "message": "stub timeout"}, status_code=504)
+        if roll < self.timeout_rate + self.error_rate:
+            self.stats["errors"] += 1
+            status_code = self._faults.choice(ERROR_STATUS_CODES)
+            return JSONResponse({"cod": status_code, "message": "stub injected error"}, status_code=status_code)
+        return None
+
+    def _cell(self, lat: float, lon: float) -> str:
+        return f"{lat:.2f}_{lon:.2f}"
+
+    def _rng(self, lat: float, lon: float, kind: str) -> random.Random:
+        return random.Random(f"{self.seed}:{kind}:{self._cell(lat, lon)}")
+
+    def recorded(self, kind: str, lat: float, lon: float) -> Optional[Dict]:
+        if not self.recordings_dir:
+            return None
+        path = os.path.join(self.recordings_dir, f"{kind}_{self._cell(lat, lon)}.json")
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            self.stats["replayed"] += 1
+            return json.load(f)
+
+    def _climate(self, lat: float, lon: float) -> Dict:
+        """Baseline conditions of a grid cell; warmer towards the equator"""
+        rng = self._rng(lat, lon, "climate")
+        return {
+            "temperature": 32.0 - abs(lat) * 0.3 + rng.uniform(-4.0, 4.0),
+            "humidity": rng.uniform(35.0, 85.0),
+            "pressure": rng.uniform(1002.0, 1018.0),
+            "wind_speed": rng.uniform(1.0, 9.0),
+            "wetness": rng.random(),
+            "phase": rng.uniform(0.0, 2 * math.pi),
+        }
+
+    def _observation(self, climate: Dict, rng: random.Random, timestamp: int, rain_key: str) -> Dict:
+        hour = (timestamp % 86400) / 3600.0
+        # Daily cycle peaking mid-afternoon, plus noise
+        temperature = climate["temperature"] + 5.0 * math.sin((hour - 9.0) / 24.0 * 2 * math.pi) + rng.gauss(0.0, 0.8)
+        humidity = min(100.0, max(5.0, climate["humidity"] - 1.5 * (temperature - climate["temperature"]) + rng.gauss(0.0, 3.0)))
+        raining = rng.random() < climate["wetness"] * 0.4
+        description, group, condition_id, icon = CONDITIONS[
+            rng.randrange(4, len(CONDITIONS)) if raining else rng.randrange(0, 4)
+        ]
+        observation = {
+            "dt": timestamp,
+            "main": {
+                "temp": round(temperature, 2),
+                "feels_like": round(temperature + (humidity - 50.0) * 0.05, 2),
+                "pressure": int(round(climate["pressure"] + rng.gauss(0.0, 1.5))),
+                "humidity": int(round(humidity)),
+            },
+            "weather": [{"id": condition_id, "main": group, "description": description, "icon": icon}],
+            "clouds": {"all": 0 if condition_id == 800 else rng.randint(10, 100)},
+            "wind": {
+                "speed": round(max(0.0, climate["wind_speed"] + rng.gauss(0.0, 1.0)), 2),
+                "deg": int((math.degrees(climate["phase"]) + rng.gauss(0.0, 20.0)) % 360),
+            },
+        }
+        if raining:
+            observation["rain"] = {rain_key: round(rng.uniform(0.1, 4.0 if condition_id == 501 else 1.5), 2)}
+        return observation
+
+    def current(self, lat: float, lon: float) -> Dict:
+        climate = self._climate(lat, lon)
+        observation = self._observation(climate, self._rng(lat, lon, "current"), self.epoch, "1h")
+        return {
+            "coord": {"lon": lon, "lat": lat},
+            **observation,
+            "base": "stations",
+            "sys": {"country": "IN"},
+            "timezone": 19800,
+            "id": 0,
+            "name": f"Stub {self._cell(lat, lon)}",
+            "cod": 200,
+        }
+
+    def forecast(self, lat: float, lon: float, cnt: Optional[int] = None) -> Dict:
+        climate = self._climate(lat, lon)
+        rng = self._rng(lat, lon, "forecast")
+        steps = min(cnt or FORECAST_STEPS, FORECAST_STEPS)
+        items = []
+        for step in range(steps):
+            timestamp = self.epoch + step * FORECAST_STEP_SECONDS
+            item = self._observation(climate, rng, timestamp, "3h")
+            item["pop"] = round(1.0 if "rain" in item else rng.uniform(0.0, 0.3), 2)
+            item["dt_txt"] = _utc_text(timestamp)
+            items.append(item)
+        return {
+            "cod": "200",
+            "message": 0,
+            "cnt": len(items),
+            "list": items,
+            "city": {
+                "id": 0,
+                "name": f"Stub {self._cell(lat, lon)}",
+                "coord": {"lat": lat, "lon": lon},
+                "country": "IN",
+                "timezone": 19800,
+            },
+        }
+
+def _utc_text(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def create_app(stub: WeatherStub) -> FastAPI:
+    """FastAPI app serving the stub under the OpenWeatherMap paths"""
+    app = FastAPI(title="OpenWeatherMap stand-in", docs_url=None, redoc_url=None)
+
+    def unauthorized() -> JSONResponse:
+        return JSONResponse({"cod": 401, "message": "Invalid API key"}, status_code=401)
+
+    @app.get("/data/2.5/weather")
+    async def weather(lat: float = Query(...), lon: float = Query(...), appid: str = Query("")):
+        if not appid:
+            return unauthorized()
+        error = await stub.inject_faults()
+        if error is not None:
+            return error
+        return stub.recorded("weather", lat, lon) or stub.current(lat, lon)
+
+    @app.get("/data/2.5/forecast")
+    async def forecast(lat: float = Query(...), lon: float = Query(...), appid: str = Query(""),
+                       cnt: Optional[int] = Query(None)):
+        if not appid:
+            return unauthorized()
+        error = await stub.inject_faults()
+        if error is not None:
+            return error
+        return stub.recorded("forecast", lat, lon) or stub.forecast(lat, lon, cnt)
+
+    @app.get("/_stub/config")
+    async def get_config():
+        return stub.config()
+
+    @app.post("/_stub/config")
+    async def update_config(changes: Dict = Body(...)):
+        try:
+            return stub.update_config(changes)
+        except (TypeError, ValueError) as e:
+            return JSONResponse({"detail": str(e)}, status_code=400)
+
+    @app.get("/_stub/stats")
+    async def get_stats():
+        return stub.stats
+
+    return app
+
+def main(argv: Optional[list] = None):
+    """Run the stand-in server"""
+    parser = argparse.ArgumentParser(description="Deterministic local OpenWeatherMap stand-in")
+    parser.add_argument("--host", default=os.getenv("WEATHER_STUB_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("WEATHER_STUB_PORT", "8090")))
+    parser.add_argument("--seed", type=int, default=int(os.getenv("WEATHER_STUB_SEED", "42")))
+    parser.add_argument("--epoch", type=int, default=DEFAULT_EPOCH, help="Unix time of current weather and the first forecast step")
+    parser.add_argument("--recordings", default=os.getenv("WEATHER_STUB_RECORDINGS"),
+                        help="Directory of recorded weather_<lat>_<lon>.json / forecast_<lat>_<lon>.json responses")
+    parser.add_argument("--latency-ms", type=float, default=float(os.getenv("WEATHER_STUB_LATENCY_MS", "0")))
+    parser.add_argument("--jitter-ms", type=float, default=float(os.getenv("WEATHER_STUB_JITTER_MS", "0")),
+                        help="Extra latency drawn uniformly from 0..jitter per request")
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("WEATHER_STUB_ERROR_RATE", "0")),
+                        help="Fraction of requests answered with 429/5xx")
+    parser.add_argument("--timeout-rate", type=float, default=float(os.getenv("WEATHER_STUB_TIMEOUT_RATE", "0")),
+                        help="Fraction of requests held open for --timeout-seconds")
+    parser.add_argument("--timeout-seconds", type=float, default=float(os.getenv("WEATHER_STUB_TIMEOUT_SECONDS", "30")))
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    stub = WeatherStub(
+        seed=args.seed,
+        epoch=args.epoch,
+        recordings_dir=args.recordings,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+    )
+    print(f"🌦️  OpenWeatherMap stand-in at http://{args.host}:{args.port}/data/2.5 (seed {args.seed})")
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
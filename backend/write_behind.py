@@ -0,0 +1,203 @@
+"""
+Write-behind buffer for telemetry rows
+
+Request handlers queue WeatherData and DiseaseDetection rows here instead
+of committing them in the request path. A background task writes them in
+bulk INSERTs whenever WRITE_BEHIND_MAX_BATCH rows are pending or
+WRITE_BEHIND_FLUSH_INTERVAL_SECONDS have passed, and once more on shutdown.
+Rows are therefore visible to readers up to one flush interval late.
+
+A flush that fails because the connection was lost or a lock could not be
+taken is retried whole by the next one. Any other failure, including
+permanent OperationalErrors such as a missing table, is handled row by
+row: the rejected rows are dropped and logged.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, DisconnectionError
+
+from database import AsyncSessionLocal
+from metrics import WRITE_BEHIND_FLUSH_SECONDS
+
+load_dotenv()
+
+# MySQL error codes worth retrying the whole batch for: can't connect, server
+# gone away, lost connection (2002, 2003, 2006, 2013, 2055), lock wait
+# timeout and deadlock (1205, 1213)
+TRANSIENT_MYSQL_ERRORS = {1205, 1213, 2002, 2003, 2006, 2013, 2055}
+# SQLite result codes: SQLITE_BUSY, SQLITE_LOCKED
+TRANSIENT_SQLITE_ERRORS = {5, 6}
+
+def is_transient_db_error(error: Exception) -> bool:
+    """Whether a failed write may succeed unchanged later: a lost connection or a lock; anything else would fail again"""
+    if isinstance(error, DisconnectionError):
+        return True
+    if not isinstance(error, DBAPIError):
+        return False
+    if error.connection_invalidated:
+        return True
+    orig = error.orig
+    sqlite_code = getattr(orig, "sqlite_errorcode", None)
+    if sqlite_code is not None:
+        return sqlite_code & 0xFF in TRANSIENT_SQLITE_ERRORS
+    args = getattr(orig, "args", ())
+    return bool(args) and args[0] in TRANSIENT_MYSQL_ERRORS
+
+class WriteBehindBuffer:
+    """
+    In-memory queue of rows to insert, flushed in bulk by a background task.
+    Must be used from the event loop thread.
+    """
+
+    def __init__(self):
+        self.max_batch = max(1, int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500")))
+        self.flush_interval = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_SECONDS", "1.0"))
+        self.max_pending = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "50000"))
+        self._pending: Dict[type, List[Dict]] = {}
+        self._pending_count = 0
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        # Statistics
+        self.rows_written = 0
+        self.dropped_rows = 0
+        self.rejected_rows = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.total_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def add(self, model: type, **values):
+        """Queue one row for model; it is inserted by the next flush"""
+        if self._pending_count >= self.max_pending:
+            self.dropped_rows += 1
+            return
+        self._pending.setdefault(model, []).append(values)
+        self._pending_count += 1
+        self.start()
+        if self._pending_count >= self.max_batch:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Insert everything queued so far, one bulk INSERT per table"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, count = self._pending, self._pending_count
+            self._pending, self._pending_count = {}, 0
+
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    for model, rows in pending.items():
+                        await db.execute(insert(model), rows)
+                    await db.commit()
+            except Exception as e:
+                self.failed_flushes += 1
+                if is_transient_db_error(e):
+                    print(f"Error flushing {count} buffered rows, retrying with the next flush: {e}")
+                    self._requeue(pending, count)
+                    return
+                print(f"Error flushing {count} buffered rows, writing them one at a time: {e}")
+                await self._flush_rows(pending)
+                return
+            finally:
+                self._record_flush(time.perf_counter() - started)
+
+            self.rows_written += count
+
+    async def _flush_rows(self, pending: Dict[type, List[Dict]]):
+        """Insert rows one by one after a rejected batch, dropping the rows the database rejects"""
+        rows = [(model, values) for model, model_rows in pending.items() for values in model_rows]
+        for position, (model, values) in enumerate(rows):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(model), [values])
+                    await db.commit()
+            except Exception as e:
+                if is_transient_db_error(e):
+                    print(f"Error writing buffered rows, retrying {len(rows) - position} with the next flush: {e}")
+                    remaining: Dict[type, List[Dict]] = {}
+                    for model, values in rows[position:]:
+                        remaining.setdefault(model, []).append(values)
+                    self._requeue(remaining, len(rows) - position)
+                    return
+                print(f"Dropping {model.__tablename__} row rejected by the database: {e}")
+                self.rejected_rows += 1
+            else:
+                self.rows_written += 1
+
+    def _requeue(self, pending: Dict[type, List[Dict]], count: int):
+        """Put rows from a failed flush back in front of rows queued since, up to max_pending"""
+        for model, rows in pending.items():
+            self._pending[model] = rows + self._pending.get(model, [])
+        self._pending_count += count
+        overflow = self._pending_count - self.max_pending
+        for rows in self._pending.values():
+            if overflow <= 0:
+                break
+            removed = min(overflow, len(rows))
+            del rows[:removed]
+            overflow -= removed
+            self._pending_count -= removed
+            self.dropped_rows += removed
+
+    def _record_flush(self, seconds: float):
+        WRITE_BEHIND_FLUSH_SECONDS.observe(seconds)
+        self.flushes += 1
+        self.total_flush_seconds += seconds
+        self.last_flush_seconds = seconds
+        self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+
+    async def _run_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Stop the background task and flush what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending_rows": self._pending_count,
+            "max_batch": self.max_batch,
+            "flush_interval_seconds": self.flush_interval,
+            "rows_written": self.rows_written,
+            "dropped_rows": self.dropped_rows,
+            "rejected_rows": self.rejected_rows,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_seconds * 1000.0, 2),
+            "average_flush_ms": round(self.total_flush_seconds / self.flushes * 1000.0, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000.0, 2),
+        }
+
+# Global instance
+telemetry_writer = WriteBehindBuffer()
@@ -15,7 +15,7 @@ import {
 } from 'lucide-react';
 
 const Dashboard = () => {
-  const { data: farms, isLoading, error, refetch } = useQuery('farms', farmsAPI.getFarms, {
+  const { data: overview, isLoading, error, refetch } = useQuery(['farms', 'overview'], farmsAPI.getFarmsOverview, {
     refetchOnWindowFocus: true,
     staleTime: 30000, // 30 seconds
   });
@@ -46,9 +46,10 @@ const Dashboard = () => {
   }
 
   // Ensure farms is always an array
-  const farmsList = Array.isArray(farms) ? farms : [];
-  const totalFarms = farmsList.length;
-  const totalCrops = farmsList.reduce((sum, farm) => sum + (farm.crops?.length || 0), 0);
+  const farmsList = Array.isArray(overview?.farms) ? overview.farms : [];
+  const totalFarms = overview?.total_farms ?? farmsList.length;
+  const totalCrops = overview?.total_crops ?? farmsList.reduce((sum, farm) => sum + (farm.crops?.length || 0), 0);
+  const pendingRecommendations = overview?.pending_recommendations ?? 0;
 
   return (
     <div className="space-y-6">
@@ -134,7 +135,7 @@ const Dashboard = () => {
               <div className="ml-5 w-0 flex-1">
                 <dl>
                   <dt className="text-sm font-medium text-gray-500 truncate">Recommendations</dt>
-                  <dd className="text-lg font-medium text-gray-900">{totalCrops}</dd>
+                  <dd className="text-lg font-medium text-gray-900">{pendingRecommendations}</dd>
                 </dl>
               </div>
             </div>
@@ -156,6 +157,8 @@ const Dashboard = () => {
                       <h4 className="text-sm font-medium text-gray-900">{farm.name}</h4>
                       <p className="text-sm text-gray-500">
                         {farm.size_acres} acres • {farm.soil_type} soil
+                        {farm.latest_weather && ` • ${farm.latest_weather.temperature.toFixed(1)}°C`}
+                        {farm.pending_recommendations > 0 && ` • ${farm.pending_recommendations} pending`}
                       </p>
                     </div>
                   </div>
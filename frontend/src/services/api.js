@@ -35,6 +35,24 @@ api.interceptors.response.use(
   }
 );
 
+// History endpoints return one page at a time; follow the X-Next-Cursor header to the end
+const HISTORY_PAGE_SIZE = 500;
+
+const getAllPages = async (url) => {
+  const rows = [];
+  let cursor = null;
+  do {
+    const params = { limit: HISTORY_PAGE_SIZE };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    const response = await api.get(url, { params });
+    rows.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return rows;
+};
+
 // Auth API
 export const authAPI = {
   login: (email, password) => api.post('/auth/login', { email, password }),
@@ -48,6 +66,10 @@ export const farmsAPI = {
     const response = await api.get('/farms');
     return response.data;
   },
+  getFarmsOverview: async () => {
+    const response = await api.get('/farms/overview');
+    return response.data;
+  },
   getFarm: async (farmId) => {
     const response = await api.get(`/farms/${farmId}`);
     return response.data;
@@ -69,12 +91,10 @@ export const farmsAPI = {
     return response.data;
   },
   getFarmRecommendations: async (farmId) => {
-    const response = await api.get(`/farms/${farmId}/recommendations`);
-    return response.data;
+    return getAllPages(`/farms/${farmId}/recommendations`);
   },
   getDiseaseHistory: async (farmId) => {
-    const response = await api.get(`/farms/${farmId}/disease-history`);
-    return response.data;
+    return getAllPages(`/farms/${farmId}/disease-history`);
   },
 };
 